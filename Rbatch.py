@@ -0,0 +1,279 @@
+"""批量转换命令行
+
+用法示例：
+    python Rbatch.py "客户报表/*.xlsx" "客户报表/*.xls" -o 输出目录 -j 8
+
+每个文件在进程池中独立转换，单个文件失败不会影响其他文件。
+sheet 与期间列默认按名称和表头关键字自动识别，也可以通过参数指定 sheet 名称。
+"""
+import argparse
+import datetime
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import Rpipeline
+from Rpipeline import ConversionPipeline
+from Rlogging import JsonLogWriter, LOG_LEVELS
+from Rexport import LONG_FORMATS, long_rows, open_long_writer
+from Rcache import ParseCache, default_cache_dir
+from Rmapping import MappingStore, default_mapping_path
+from Rperiods import AUTO_CONFIDENCE
+from Rprofile import format_profile, merge_profiles
+
+# 目录作为输入时收集的文件类型
+EXCEL_PATTERNS = ('*.xlsx', '*.xls')
+
+
+def collect_files(inputs):
+    """展开输入的通配符和目录，返回去重后的文件列表"""
+    files = []
+    seen = set()
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            matches = []
+            for excel_pattern in EXCEL_PATTERNS:
+                matches.extend(glob.glob(os.path.join(pattern, excel_pattern)))
+        else:
+            matches = glob.glob(pattern, recursive=True)
+        for path in sorted(matches):
+            # 跳过Excel打开文件时产生的锁文件
+            if os.path.basename(path).startswith('~$'):
+                continue
+            key = os.path.abspath(path)
+            if key not in seen and os.path.isfile(path):
+                seen.add(key)
+                files.append(path)
+    return files
+
+
+def build_output_paths(files, output_dir, suffix):
+    """为每个输入文件生成不重名的输出路径"""
+    outputs = []
+    used = set()
+    for path in files:
+        base = os.path.splitext(os.path.basename(path))[0] + suffix
+        name = base
+        index = 2
+        while name in used:
+            name = f"{base}_{index}"
+            index += 1
+        used.add(name)
+        outputs.append(os.path.join(output_dir, name + '.xlsx'))
+    return outputs
+
+
+def convert_file(file_path, save_path, sheets=None, log_level=None, compression='standard',
+                 long_format=False, cache_dir=None, customer=None, mapping_path=None,
+                 confirm_mappings=False, min_confidence=None, profile=False):
+    """在工作进程中转换单个文件，返回状态字典
+
+    指定 log_level 时，该级别及以上的日志随结果一起返回，由主进程统一写入日志文件；
+    long_format 为 True 时，长表格式的数据行也随结果一起返回；
+    指定 cache_dir 时使用该目录中的解析缓存；指定 customer 时使用 mapping_path 中
+    该客户的项目对应关系，confirm_mappings 为 True 时保存本次的精确和同义词匹配结果；
+    期间列的识别置信度低于 min_confidence 时该文件按失败处理，需要人工确认；
+    profile 为 True 时各阶段的用时和计数随结果一起返回，并保存在输出文件旁边。
+    """
+    start = time.perf_counter()
+    logs = []
+    if log_level:
+        def log(message, level):
+            logs.append({
+                'time': datetime.datetime.now().isoformat(timespec='seconds'),
+                'file': file_path,
+                'level': level,
+                'message': message
+            })
+    else:
+        log = None
+    try:
+        cache = ParseCache(cache_dir) if cache_dir else None
+        mappings = MappingStore(mapping_path) if customer else None
+        pipeline = ConversionPipeline(log=log, log_level=log_level or 'DEBUG', compression=compression,
+                                      cache=cache, mappings=mappings, min_confidence=min_confidence,
+                                      profile=profile)
+        conversion = pipeline.run(file_path, sheets=sheets, save_path=save_path, customer=customer,
+                                  confirm_mappings=confirm_mappings)
+        result = {
+            'file': file_path,
+            'status': 'ok',
+            'output': save_path,
+            'seconds': time.perf_counter() - start
+        }
+        if profile:
+            result['profile'] = conversion.profile.to_dict()
+        if long_format:
+            company = os.path.splitext(os.path.basename(file_path))[0]
+            result['rows'] = list(long_rows(company, conversion.processed_data, conversion.indicators))
+    except Exception as e:
+        result = {
+            'file': file_path,
+            'status': 'error',
+            'error': f"{type(e).__name__}: {e}",
+            'seconds': time.perf_counter() - start
+        }
+    result['logs'] = logs
+    return result
+
+
+def run_batch(files, output_dir, workers=None, sheets=None, suffix='_转换', report=print,
+              log_writer=None, log_level='INFO', compression='standard', long_writer=None,
+              cache_dir=None, customer=None, mapping_path=None, confirm_mappings=False,
+              min_confidence=None, profile=False):
+    """使用进程池批量转换文件，返回每个文件的状态列表
+
+    指定 log_writer（JsonLogWriter）时，各文件的日志在后台线程中写入日志文件；
+    指定 long_writer 时，每个文件完成后立即把它的长表数据写入，不在内存中累积；
+    profile 为 True 时每个文件完成后打印它的各阶段用时和计数。
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    outputs = build_output_paths(files, output_dir, suffix)
+    results = []
+    if log_writer is None:
+        log_level = None
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(convert_file, file_path, save_path, sheets, log_level, compression,
+                            long_writer is not None, cache_dir, customer, mapping_path,
+                            confirm_mappings, min_confidence, profile): file_path
+            for file_path, save_path in zip(files, outputs)
+        }
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                # 工作进程异常退出等情况
+                result = {
+                    'file': futures[future],
+                    'status': 'error',
+                    'error': f"{type(e).__name__}: {e}",
+                    'seconds': 0.0
+                }
+            rows = result.pop('rows', None)
+            if long_writer is not None and rows:
+                long_writer.write(rows)
+            if log_writer is not None:
+                for record in result.pop('logs', ()):
+                    log_writer.write(record)
+                if result['status'] != 'ok':
+                    log_writer.write({
+                        'time': datetime.datetime.now().isoformat(timespec='seconds'),
+                        'file': result['file'],
+                        'level': 'ERROR',
+                        'message': result['error']
+                    })
+            results.append(result)
+            report(format_result(result, len(results), len(files)))
+            if 'profile' in result:
+                report(format_profile(result['profile']))
+
+    return results
+
+
+def format_result(result, index, total):
+    """格式化单个文件的处理状态"""
+    name = os.path.basename(result['file'])
+    if result['status'] == 'ok':
+        return f"[{index}/{total}] 成功 {name} -> {result['output']} ({result['seconds']:.2f}s)"
+    return f"[{index}/{total}] 失败 {name}: {result['error']} ({result['seconds']:.2f}s)"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="批量转换客户报表")
+    parser.add_argument('inputs', nargs='+', help="输入文件、目录或通配符（如 \"报表/*.xlsx\"）")
+    parser.add_argument('-o', '--output-dir', required=True, help="输出目录")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="进程数，默认等于CPU核数")
+    parser.add_argument('--suffix', default='_转换', help="输出文件名后缀")
+    parser.add_argument('--balance-sheet', help="资产负债表sheet名称，默认自动识别")
+    parser.add_argument('--cash-flow', help="现金流量表sheet名称，默认自动识别")
+    parser.add_argument('--income-statement', help="损益表sheet名称，默认自动识别")
+    parser.add_argument('--compression', default='standard', choices=list(Rpipeline.COMPRESSION_PROFILES),
+                        help="输出文件的压缩方式：standard 默认，fast 更快但文件稍大，store 不压缩")
+    parser.add_argument('--long-format', choices=list(LONG_FORMATS),
+                        help="同时将所有文件的数据以长表格式汇总写入输出目录下的 statements.<格式> 文件")
+    parser.add_argument('--min-confidence', type=float, default=AUTO_CONFIDENCE,
+                        help=f"自动识别期间列的最低置信度（0-1），低于该值的文件需要人工确认，默认{AUTO_CONFIDENCE}")
+    parser.add_argument('--cache-dir', default=None,
+                        help="解析缓存目录，默认使用与界面相同的缓存目录")
+    parser.add_argument('--no-cache', action='store_true', help="不使用解析缓存")
+    parser.add_argument('--customer', help="客户名称，使用该客户已确认的项目对应关系")
+    parser.add_argument('--mapping-db', default=None,
+                        help="项目对应关系数据库，默认使用与界面相同的数据库")
+    parser.add_argument('--confirm-mappings', action='store_true',
+                        help="将本次的精确和同义词匹配结果保存为该客户确认的对应关系（需要同时指定 --customer），"
+                             "模糊匹配和未匹配的项目需要在界面中确认")
+    parser.add_argument('--profile', action='store_true',
+                        help="记录每个文件各阶段的用时和计数，打印出来并保存在输出文件旁边（.profile.json）")
+    parser.add_argument('--log-file', help="将处理日志以JSON行格式写入该文件")
+    parser.add_argument('--log-level', default='INFO', choices=list(LOG_LEVELS),
+                        help="写入日志文件的最低级别，默认INFO")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    if not Rpipeline.check_time_lock():
+        print("校验出错！！请检查程序版本！！")
+        return 1
+
+    args = parse_args(argv)
+    files = collect_files(args.inputs)
+    if not files:
+        print("没有找到需要处理的文件")
+        return 1
+
+    sheets = None
+    names = [args.balance_sheet, args.cash_flow, args.income_statement]
+    if any(names):
+        if not all(names):
+            print("指定sheet名称时需要同时指定三张报表")
+            return 1
+        sheets = dict(zip(Rpipeline.SHEET_TYPES, names))
+
+    if args.confirm_mappings and not args.customer:
+        print("保存项目对应关系时需要指定 --customer")
+        return 1
+
+    print(f"共 {len(files)} 个文件，开始转换...")
+    start = time.perf_counter()
+    log_writer = JsonLogWriter(args.log_file) if args.log_file else None
+    long_writer = None
+    if args.long_format:
+        os.makedirs(args.output_dir, exist_ok=True)
+        long_writer = open_long_writer(
+            os.path.join(args.output_dir, f"statements.{args.long_format}"), args.long_format)
+    try:
+        results = run_batch(files, args.output_dir, args.workers, sheets, args.suffix,
+                            log_writer=log_writer, log_level=args.log_level,
+                            compression=args.compression, long_writer=long_writer,
+                            cache_dir=None if args.no_cache else args.cache_dir or default_cache_dir(),
+                            customer=args.customer, mapping_path=args.mapping_db or default_mapping_path(),
+                            confirm_mappings=args.confirm_mappings, min_confidence=args.min_confidence,
+                            profile=args.profile)
+    finally:
+        if log_writer is not None:
+            log_writer.close()
+        if long_writer is not None:
+            long_writer.close()
+    elapsed = time.perf_counter() - start
+
+    failed = [result for result in results if result['status'] != 'ok']
+    print("=" * 50)
+    print(f"成功 {len(results) - len(failed)} 个，失败 {len(failed)} 个，"
+          f"用时 {elapsed:.2f} 秒，吞吐 {len(results) / elapsed if elapsed else 0:.2f} 文件/秒")
+    for result in failed:
+        print(f"  失败：{result['file']} - {result['error']}")
+    profiles = [result['profile'] for result in results if 'profile' in result]
+    if profiles:
+        print("各阶段合计：")
+        print(format_profile(merge_profiles(profiles)))
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
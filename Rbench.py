@@ -0,0 +1,512 @@
+"""性能基准测试
+
+生成接近真实客户报表的合成工作簿（三张报表，可以调整行数、附加列数、项目写法的变化、
+公式比例、TB辅助列、因格式设置而虚增的行数以及 .xls / .xlsx 格式），在无界面的情况下
+逐个阶段计时（加载、读取sheet、预处理、期间列识别、三张报表的提取、财务指标、导出），
+并用 tracemalloc 记录每个阶段的峰值内存。结果保存为JSON文件，可以与之前版本的结果
+自动比较，找出变慢或内存增加的阶段。
+
+命令行用法：
+    python Rbench.py list                                 列出基准用例
+    python Rbench.py run -o 结果.json [--quick] [--cases 用例,...] [--repeat 3]
+    python Rbench.py compare 旧结果.json 新结果.json [--threshold 0.2]
+    python Rbench.py generate 文件.xlsx [--rows 2000] [--tb-columns 2] ...
+
+生成 .xls 文件需要安装 xlwt。
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import openpyxl
+import pandas as pd
+from openpyxl.styles import Border, Side
+from openpyxl.utils import get_column_letter
+
+import Rpipeline
+from Rpipeline import ConversionPipeline, get_templates, guess_sheets
+from Rmatcher import MATCH_SYNONYMS
+
+# 结果文件的格式版本
+BENCH_VERSION = 1
+
+# 计时的阶段（按执行顺序）
+STAGES = (
+    'load',
+    'read_sheets',
+    'preprocess_sheet',
+    'find_period_columns',
+    'process_balance_sheet',
+    'process_cash_flow',
+    'process_income_statement',
+    'calculate_financial_indicators',
+    'export_data'
+)
+
+# 每个用例默认重复的次数，计时取最小值
+DEFAULT_REPEAT = 3
+
+# 比较时判定为变慢的比例，以及忽略的绝对差异（秒 / 字节）
+DEFAULT_THRESHOLD = 0.2
+MIN_SECONDS_DIFF = 0.005
+MIN_BYTES_DIFF = 1024 * 1024
+
+# .xls 格式的行列上限
+XLS_MAX_ROWS = 65536
+XLS_MAX_COLUMNS = 256
+
+# 表头之前的标题行
+TITLE_ROWS = 4
+
+# 数值写为带千分位逗号文本的比例
+TEXT_NUMBER_RATIO = 0.2
+
+
+class BenchmarkCase:
+    """一个基准用例，即一份合成工作簿的参数
+
+    rows 为每张报表的表体行数（超过模板项目数的行为明细项目），extra_columns 为期间列
+    之外的附加列数，label_variants 为项目名称使用其它写法的比例，formula_density 为
+    数值单元格写为公式（没有缓存值）的比例，tb_columns 为每侧期间列之后的TB辅助列数，
+    inflated_rows 为数据之后只有格式的空行数，fmt 为 'xlsx' 或 'xls'。
+    """
+
+    def __init__(self, name, rows=200, extra_columns=0, label_variants=0.0, formula_density=0.0,
+                 tb_columns=0, inflated_rows=0, fmt='xlsx', seed=1):
+        self.name = name
+        self.rows = rows
+        self.extra_columns = extra_columns
+        self.label_variants = label_variants
+        self.formula_density = formula_density
+        self.tb_columns = tb_columns
+        self.inflated_rows = inflated_rows
+        self.fmt = fmt
+        self.seed = seed
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+# 默认的基准用例
+CASES = [
+    BenchmarkCase('baseline'),
+    BenchmarkCase('rows-2000', rows=2000),
+    BenchmarkCase('rows-10000', rows=10000),
+    BenchmarkCase('wide', extra_columns=40),
+    BenchmarkCase('label-variants', label_variants=0.6),
+    BenchmarkCase('formulas', rows=2000, formula_density=0.3),
+    BenchmarkCase('tb-columns', tb_columns=3),
+    BenchmarkCase('inflated-rows', inflated_rows=50000),
+    BenchmarkCase('xls', fmt='xls'),
+    BenchmarkCase('xls-rows-2000', rows=2000, fmt='xls'),
+    BenchmarkCase('mixed', rows=2000, extra_columns=20, label_variants=0.4,
+                  formula_density=0.1, tb_columns=2, inflated_rows=10000)
+]
+
+# --quick 时只运行的用例
+QUICK_CASES = ('baseline', 'label-variants', 'tb-columns', 'xls')
+
+
+def vary_label(label, rng, index):
+    """把模板项目名称改写为客户报表中常见的其它写法"""
+    name = label.strip()
+    choice = rng.randrange(5)
+    if choice == 0 and name in MATCH_SYNONYMS:
+        return rng.choice(MATCH_SYNONYMS[name])
+    if choice <= 1:
+        return f"{index}、{name}"
+    if choice == 2:
+        return name.replace('（', '(').replace('）', ')')
+    if choice == 3:
+        return f"  {name}：" if not name.endswith(('：', ':')) else f"  {name}"
+    return " ".join(name) if len(name) <= 6 else name.replace('的', '')
+
+
+def _statement_labels(template_labels, case, rng):
+    """生成表体的项目名称：先是模板项目（按比例改写），之后为明细项目"""
+    labels = []
+    for index in range(case.rows):
+        if index < len(template_labels):
+            label = template_labels[index]
+            if rng.random() < case.label_variants:
+                label = vary_label(label, rng, index + 1)
+            labels.append(label.strip())
+        else:
+            labels.append(f"其中：明细项目{index + 1}")
+    return labels
+
+
+def _write_number(write, case, rng, row, col, first_data_row):
+    """写入一个数值单元格：按比例写为公式、带千分位逗号的文本或数字"""
+    value = round(rng.uniform(-1e4, 1e6), 2)
+    if case.fmt == 'xlsx' and rng.random() < case.formula_density and row - 2 >= first_data_row:
+        # 引用上方单元格的公式，没有缓存值，提取时会走公式回退
+        letter = get_column_letter(col)
+        write(row, col, f"=SUM({letter}{row - 2}:{letter}{row - 1})")
+    elif rng.random() < TEXT_NUMBER_RATIO:
+        write(row, col, f"{value:,.2f}")
+    else:
+        write(row, col, value)
+
+
+def _side_columns(case, labels_header, period_headers):
+    """一侧的表头：项目列、行次、期间列、TB辅助列"""
+    headers = [labels_header, '行次'] + list(period_headers)
+    headers += [f"TB {index + 1}" for index in range(case.tb_columns)]
+    return headers
+
+
+def _write_statement(write, case, rng, title, sides, extra_columns):
+    """写入一张报表
+
+    sides 为 [(表头, 项目名称列表)]，两侧报表左右并排，表头中期间列以外的列写入行次或空值。
+    返回数据的最后一行。
+    """
+    write(1, 1, title)
+    write(2, 1, "编制单位：示例有限公司")
+    write(3, 1, "2024年12月31日")
+    write(4, 1, "单位：元")
+    header_row = TITLE_ROWS + 1
+    first_data_row = header_row + 1
+    col = 1
+    for headers, labels in sides:
+        for offset, header in enumerate(headers):
+            write(header_row, col + offset, header)
+        for index, label in enumerate(labels):
+            row = first_data_row + index
+            write(row, col, label)
+            write(row, col + 1, index + 1)
+            for offset in range(2, len(headers)):
+                _write_number(write, case, rng, row, col + offset, first_data_row)
+        col += len(headers) + 1
+    for index in range(extra_columns):
+        write(header_row, col + index, f"备注{index + 1}")
+        for row in range(first_data_row, first_data_row + case.rows, 7):
+            write(row, col + index, f"说明{row}" if index % 2 else row)
+    return first_data_row + case.rows - 1
+
+
+def _workbook_sheets(case, rng):
+    """三张报表的标题、两侧表头和项目名称"""
+    templates = get_templates()
+    balance = list(templates['balance_sheet'].names)
+    split = next(index for index, name in enumerate(balance) if name.strip() == '资产总计') + 1
+    return [
+        ('资产负债表', [
+            (_side_columns(case, '资产', ('期末余额', '年初余额')),
+             _statement_labels(balance[:split], case, rng)),
+            (_side_columns(case, '负债和所有者权益', ('期末余额', '年初余额')),
+             _statement_labels(balance[split:], case, rng))
+        ]),
+        ('现金流量表', [
+            (_side_columns(case, '项目', ('本期金额', '上期金额')),
+             _statement_labels(list(templates['cash_flow'].names), case, rng))
+        ]),
+        ('利润表', [
+            (_side_columns(case, '项目', ('本期金额', '上期金额')),
+             _statement_labels(list(templates['income_statement'].names), case, rng))
+        ])
+    ]
+
+
+def generate_workbook(path, case):
+    """按用例参数生成合成工作簿，格式由 case.fmt 决定"""
+    rng = random.Random(case.seed)
+    if case.fmt == 'xls':
+        _generate_xls(path, case, rng)
+    else:
+        _generate_xlsx(path, case, rng)
+    return path
+
+
+def _generate_xlsx(path, case, rng):
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    border = Border(bottom=Side(style='thin'))
+    for title, sides in _workbook_sheets(case, rng):
+        worksheet = workbook.create_sheet(title)
+
+        def write(row, col, value):
+            worksheet.cell(row=row, column=col, value=value)
+
+        last_row = _write_statement(write, case, rng, title, sides, case.extra_columns)
+        # 只有格式的空行，使工作表的已使用区域远大于实际数据
+        for row in range(last_row + 1, last_row + case.inflated_rows + 1):
+            worksheet.cell(row=row, column=1).border = border
+    workbook.save(path)
+
+
+def _generate_xls(path, case, rng):
+    try:
+        import xlwt
+    except ImportError:
+        raise ImportError("生成.xls文件需要安装xlwt") from None
+    workbook = xlwt.Workbook(encoding='utf-8')
+    style = xlwt.easyxf('borders: bottom thin')
+    for title, sides in _workbook_sheets(case, rng):
+        worksheet = workbook.add_sheet(title)
+
+        def write(row, col, value):
+            if row <= XLS_MAX_ROWS and col <= XLS_MAX_COLUMNS:
+                worksheet.write(row - 1, col - 1, value)
+
+        last_row = _write_statement(write, case, rng, title, sides,
+                                    min(case.extra_columns, XLS_MAX_COLUMNS // 2))
+        for row in range(last_row + 1, min(last_row + case.inflated_rows, XLS_MAX_ROWS) + 1):
+            worksheet.write(row - 1, 0, None, style)
+    workbook.save(path)
+
+
+class StageTimer:
+    """记录每个阶段的用时，trace_memory 为 True 时同时记录阶段内的峰值内存"""
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.seconds = {}
+        self.peak_bytes = {}
+
+    def measure(self, stage, func, *args):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            current = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        result = func(*args)
+        self.seconds[stage] = time.perf_counter() - start
+        if self.trace_memory:
+            self.peak_bytes[stage] = tracemalloc.get_traced_memory()[1] - current
+        return result
+
+
+def convert_stages(file_path, save_path, timer):
+    """按阶段执行一次完整的转换（不使用缓存和项目对应关系），返回 (报表数据, 期间列选择)"""
+    pipeline = ConversionPipeline()
+    document = timer.measure('load', pipeline.load, file_path)
+    try:
+        sheets = guess_sheets(document.sheet_names)
+        timer.measure('read_sheets', lambda: [document.sheet(name) for name in sheets.values()])
+        timer.measure('preprocess_sheet', pipeline.preprocess, document, sheets)
+        periods = timer.measure('find_period_columns', pipeline.detect_periods, document, sheets)
+        selection = pipeline.auto_selection(periods)
+        templates = get_templates()
+        processed_data = {'balance_sheet': timer.measure(
+            'process_balance_sheet', pipeline.process_balance_sheet, document,
+            document.sheet(sheets['balance_sheet']), selection['balance_sheet'], templates['balance_sheet'])}
+        for sheet_type in ('cash_flow', 'income_statement'):
+            processed_data[sheet_type] = timer.measure(
+                f'process_{sheet_type}', pipeline.process_statement, document,
+                document.sheet(sheets[sheet_type]), selection[sheet_type], templates[sheet_type], sheet_type)
+    finally:
+        document.close()
+    indicators = timer.measure(
+        'calculate_financial_indicators', pipeline.calculate_financial_indicators,
+        processed_data['balance_sheet'], processed_data['income_statement'], processed_data['cash_flow'])
+    timer.measure('export_data', pipeline.export, processed_data, save_path, indicators)
+    return processed_data, selection
+
+
+def run_case(case, directory, repeat=DEFAULT_REPEAT):
+    """运行一个基准用例
+
+    先不跟踪内存重复计时 repeat 次（tracemalloc 会明显拖慢执行），再跟踪内存运行一次。
+    """
+    file_path = os.path.join(directory, f"{case.name}.{case.fmt}")
+    save_path = os.path.join(directory, f"{case.name}_转换.xlsx")
+    start = time.perf_counter()
+    generate_workbook(file_path, case)
+    generate_seconds = time.perf_counter() - start
+
+    runs = []
+    for _ in range(repeat):
+        timer = StageTimer()
+        processed_data, selection = convert_stages(file_path, save_path, timer)
+        runs.append(timer.seconds)
+
+    timer = StageTimer(trace_memory=True)
+    tracemalloc.start()
+    try:
+        convert_stages(file_path, save_path, timer)
+    finally:
+        tracemalloc.stop()
+
+    stages = {}
+    for stage in STAGES:
+        times = [seconds[stage] for seconds in runs]
+        stages[stage] = {
+            'seconds': min(times),
+            'median': statistics.median(times),
+            'peak_bytes': timer.peak_bytes[stage]
+        }
+    # 有数值的模板项目数，用于发现提取结果的变化
+    matched = sum(int(template.array.any(axis=1).sum()) for template in processed_data.values())
+    return {
+        'case': case.to_dict(),
+        'file_bytes': os.path.getsize(file_path),
+        'generate_seconds': generate_seconds,
+        'selection': selection,
+        'matched_items': matched,
+        'total_seconds': sum(stage['seconds'] for stage in stages.values()),
+        'peak_bytes': max(stage['peak_bytes'] for stage in stages.values()),
+        'stages': stages
+    }
+
+
+def environment():
+    """运行环境的版本信息"""
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'openpyxl': openpyxl.__version__,
+        'pandas': pd.__version__
+    }
+
+
+def run_benchmarks(cases, repeat=DEFAULT_REPEAT, directory=None, report=print):
+    """运行多个基准用例，返回可以保存为JSON的结果
+
+    directory 为生成文件的目录，为None时使用临时目录，运行结束后删除。
+    """
+    results = {
+        'version': BENCH_VERSION,
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'environment': environment(),
+        'repeat': repeat,
+        'cases': {}
+    }
+    with tempfile.TemporaryDirectory() as temp_dir:
+        work_dir = directory or temp_dir
+        os.makedirs(work_dir, exist_ok=True)
+        for case in cases:
+            result = run_case(case, work_dir, repeat)
+            results['cases'][case.name] = result
+            report(f"{case.name:<16} {result['total_seconds'] * 1000:10.1f} ms  "
+                   f"峰值内存 {result['peak_bytes'] / 1024 / 1024:8.1f} MB  "
+                   f"匹配项目 {result['matched_items']}")
+    return results
+
+
+def compare_results(base, new, threshold=DEFAULT_THRESHOLD):
+    """比较两次基准测试的结果
+
+    返回 [(用例, 阶段, 指标, 旧值, 新值, 比例)] 中变慢或内存增加超过 threshold 的项，
+    忽略小于 MIN_SECONDS_DIFF / MIN_BYTES_DIFF 的绝对差异（计时噪声）。
+    """
+    regressions = []
+    for name, new_case in new['cases'].items():
+        base_case = base['cases'].get(name)
+        if base_case is None:
+            continue
+        for stage, new_stage in new_case['stages'].items():
+            base_stage = base_case['stages'].get(stage)
+            if base_stage is None:
+                continue
+            for metric, min_diff in (('seconds', MIN_SECONDS_DIFF), ('peak_bytes', MIN_BYTES_DIFF)):
+                old_value, new_value = base_stage[metric], new_stage[metric]
+                if new_value - old_value < min_diff:
+                    continue
+                ratio = new_value / old_value if old_value else float('inf')
+                if ratio > 1 + threshold:
+                    regressions.append((name, stage, metric, old_value, new_value, ratio))
+    return regressions
+
+
+def format_comparison(base, new):
+    """两次结果中各用例各阶段用时的对比表"""
+    lines = [f"{'用例':<16}{'阶段':<32}{'旧(ms)':>10}{'新(ms)':>10}{'比例':>8}"]
+    for name, new_case in new['cases'].items():
+        base_case = base['cases'].get(name)
+        if base_case is None:
+            lines.append(f"{name:<16}（旧结果中没有该用例）")
+            continue
+        for stage, new_stage in new_case['stages'].items():
+            if stage not in base_case['stages']:
+                continue
+            old_value = base_case['stages'][stage]['seconds']
+            new_value = new_stage['seconds']
+            ratio = f"{new_value / old_value:.2f}" if old_value else "-"
+            lines.append(f"{name:<16}{stage:<32}{old_value * 1000:>10.1f}{new_value * 1000:>10.1f}{ratio:>8}")
+        if base_case['matched_items'] != new_case['matched_items']:
+            lines.append(f"{name:<16}匹配项目数变化：{base_case['matched_items']} → {new_case['matched_items']}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="报表转换性能基准测试")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help="列出基准用例")
+
+    run = commands.add_parser('run', help="运行基准测试并保存结果")
+    run.add_argument('-o', '--output', required=True, help="结果JSON文件")
+    run.add_argument('--cases', help="只运行这些用例（逗号分隔）")
+    run.add_argument('--quick', action='store_true', help="只运行少量用例：" + "、".join(QUICK_CASES))
+    run.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="每个用例重复计时的次数")
+    run.add_argument('--keep', help="保留生成的文件和转换结果的目录")
+
+    compare = commands.add_parser('compare', help="比较两次结果，有变慢的阶段时返回1")
+    compare.add_argument('base', help="旧结果JSON文件")
+    compare.add_argument('new', help="新结果JSON文件")
+    compare.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                         help="判定为变慢的比例，默认0.2（即慢20%%）")
+
+    generate = commands.add_parser('generate', help="生成一份合成工作簿")
+    generate.add_argument('file', help="输出文件（.xlsx 或 .xls）")
+    defaults = BenchmarkCase('generate')
+    for option in ('rows', 'extra_columns', 'tb_columns', 'inflated_rows', 'seed'):
+        generate.add_argument('--' + option.replace('_', '-'), type=int, default=getattr(defaults, option))
+    for option in ('label_variants', 'formula_density'):
+        generate.add_argument('--' + option.replace('_', '-'), type=float, default=getattr(defaults, option))
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        for case in CASES:
+            options = ", ".join(f"{key}={value}" for key, value in case.to_dict().items() if key != 'name')
+            print(f"{case.name:<16}{options}")
+    elif args.command == 'run':
+        if not Rpipeline.check_time_lock():
+            print("校验出错！！请检查程序版本！！")
+            return 1
+        cases = CASES
+        if args.cases:
+            names = args.cases.split(',')
+            unknown = set(names) - {case.name for case in CASES}
+            if unknown:
+                print(f"未知的用例：{'、'.join(sorted(unknown))}")
+                return 1
+            cases = [case for case in CASES if case.name in names]
+        elif args.quick:
+            cases = [case for case in CASES if case.name in QUICK_CASES]
+        results = run_benchmarks(cases, args.repeat, args.keep)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=1)
+        print(f"结果已保存到 {args.output}")
+    elif args.command == 'compare':
+        with open(args.base, encoding='utf-8') as f:
+            base = json.load(f)
+        with open(args.new, encoding='utf-8') as f:
+            new = json.load(f)
+        print(format_comparison(base, new))
+        regressions = compare_results(base, new, args.threshold)
+        for name, stage, metric, old_value, new_value, ratio in regressions:
+            unit = "用时" if metric == 'seconds' else "峰值内存"
+            print(f"变慢：{name} / {stage} 的{unit}为之前的 {ratio:.2f} 倍")
+        return 1 if regressions else 0
+    else:
+        ext = os.path.splitext(args.file)[1].lower().lstrip('.')
+        if ext not in ('xlsx', 'xls'):
+            print("只能生成 .xlsx 或 .xls 文件")
+            return 1
+        options = {key: value for key, value in vars(args).items() if key not in ('command', 'file')}
+        generate_workbook(args.file, BenchmarkCase(os.path.basename(args.file), fmt=ext, **options))
+        print(f"已生成 {args.file}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
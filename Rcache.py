@@ -0,0 +1,276 @@
+"""解析缓存
+
+客户经常重复发送同一份报表，分析人员也会反复打开同一个文件。缓存以
+文件内容的SHA-256和缓存版本为键，把读取到的sheet值网格、公式单元格位置和识别出的期间列
+以压缩的二进制格式（pickle + zlib）保存在本地目录中，再次打开内容相同的文件时
+不需要重新解析Excel。缓存目录有总大小上限，超出时按最近使用时间淘汰。
+
+命令行用法：
+    python Rcache.py info          查看缓存目录、条目数和大小
+    python Rcache.py list          列出缓存条目（最近使用的在前）
+    python Rcache.py clear         清空缓存
+    python Rcache.py prune         按大小上限淘汰
+"""
+import argparse
+import datetime
+import hashlib
+import os
+import pickle
+import sys
+import zlib
+
+from Rloader import SheetGrid, FormulaIndex, find_formula_cells, open_document
+from Rprofile import NULL_PROFILE
+
+# 缓存版本，读取或期间列识别的逻辑变化后需要递增，旧版本的缓存自动失效
+CACHE_VERSION = 4
+
+# 缓存目录的默认大小上限（字节）
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# 缓存文件扩展名
+CACHE_SUFFIX = '.cache'
+
+# 计算文件哈希时每次读取的字节数
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def default_cache_dir():
+    """默认缓存目录，可以通过环境变量 REPORT_CACHE_DIR 指定"""
+    if os.environ.get('REPORT_CACHE_DIR'):
+        return os.environ['REPORT_CACHE_DIR']
+    base = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'report-conversion-tool')
+
+
+def file_digest(file_path):
+    """计算文件内容的SHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """以文件内容哈希为键的磁盘缓存
+
+    每个条目是一个文件，写入时先写临时文件再替换，多个进程同时使用同一目录是安全的。
+    读取命中时更新文件的修改时间，淘汰时删除修改时间最早的条目。
+    """
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+
+    def key(self, file_path):
+        """缓存键：文件内容哈希 + 缓存版本"""
+        return f"{file_digest(file_path)}-v{CACHE_VERSION}"
+
+    def path(self, key):
+        return os.path.join(self.directory, key + CACHE_SUFFIX)
+
+    def get(self, key):
+        """读取缓存条目，不存在或已损坏时返回None"""
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            return None
+        except (OSError, zlib.error, pickle.UnpicklingError, EOFError, ValueError):
+            self._remove(path)
+            return None
+        if entry.get('version') != CACHE_VERSION:
+            return None
+        try:
+            # 记录最近使用时间
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key, entry):
+        """写入缓存条目，然后按大小上限淘汰"""
+        os.makedirs(self.directory, exist_ok=True)
+        entry = dict(entry, version=CACHE_VERSION)
+        data = zlib.compress(pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL))
+        path = self.path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        self.evict(keep=path)
+
+    def entries(self):
+        """返回所有缓存条目 [(路径, 大小, 最近使用时间)]，最近使用的在前"""
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return entries
+        for name in names:
+            if not name.endswith(CACHE_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        entries.sort(key=lambda entry: entry[2], reverse=True)
+        return entries
+
+    def size(self):
+        """缓存的总大小（字节）"""
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep=None):
+        """删除最久未使用的条目，直到总大小不超过上限，返回删除的条目数"""
+        total = 0
+        removed = 0
+        for path, size, _ in self.entries():
+            total += size
+            if total > self.max_bytes and path != keep:
+                self._remove(path)
+                total -= size
+                removed += 1
+        return removed
+
+    def clear(self):
+        """删除所有缓存条目，返回删除的条目数"""
+        entries = self.entries()
+        for path, _, _ in entries:
+            self._remove(path)
+        return len(entries)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class CachedDocument:
+    """带缓存的工作簿
+
+    与 WorkbookDocument 接口相同。缓存中已有的sheet直接从缓存构建值网格，
+    没有的sheet才打开原文件读取；关闭时把新读取的sheet、公式单元格位置和期间列写回缓存。
+    预处理只在网格上记录排除的列，不修改缓存中的行数据。
+    """
+
+    def __init__(self, file_path, cache):
+        self.file_path = file_path
+        self.cache = cache
+        self._key = cache.key(file_path)
+        entry = cache.get(self._key)
+        self.from_cache = entry is not None
+        if entry is None:
+            entry = {'sheet_names': None, 'sheets': {}, 'formulas': {}, 'periods': {}}
+        self._entry = entry
+        self._cached = self._cached_keys()
+        self._source = None
+        self._sheets = {}
+        self.period_detections = dict(entry['periods'])
+        self.label_matches = {}
+        self.match_methods = {}
+        self.profile = NULL_PROFILE
+        if entry['sheet_names'] is None:
+            entry['sheet_names'] = list(self.source().sheet_names)
+        self.sheet_names = list(entry['sheet_names'])
+
+    def source(self):
+        """原文件的工作簿，只在缓存中缺少数据时才打开"""
+        if self._source is None:
+            self._source = open_document(self.file_path)
+        return self._source
+
+    def sheet(self, sheet_name):
+        """获取sheet的值网格"""
+        if sheet_name not in self._sheets:
+            rows = self._entry['sheets'].get(sheet_name)
+            if rows is None:
+                source = self.source()
+                source.profile = self.profile
+                rows = source.sheet(sheet_name).rows
+                self._entry['sheets'][sheet_name] = rows
+            else:
+                self.profile.count('sheets_from_cache')
+            self._sheets[sheet_name] = SheetGrid(sheet_name, rows)
+        return self._sheets[sheet_name]
+
+    def formula_cells(self, sheet_name):
+        """sheet中含有公式的单元格坐标集合，无法确定时为None
+
+        第一次需要时直接从原文件的压缩包中扫描（不打开工作簿），结果写入缓存。
+        """
+        if sheet_name not in self._entry['formulas']:
+            self._entry['formulas'][sheet_name] = find_formula_cells(self.file_path, sheet_name, self.profile)
+        return self._entry['formulas'][sheet_name]
+
+    def formula_index(self, sheet_name, columns):
+        """获取公式索引，sheet中没有公式时不会打开原文件"""
+        return FormulaIndex(self, sheet_name, tuple(sorted(set(columns))))
+
+    def formula_worksheet(self, sheet_name):
+        """获取公式版本的只读worksheet（需要打开原文件）"""
+        return self.source().formula_worksheet(sheet_name)
+
+    def close(self):
+        """关闭原文件，有新数据时写回缓存"""
+        if self._source is not None:
+            self._source.close()
+            self._source = None
+        self._entry['periods'].update(self.period_detections)
+        if self._cached_keys() != self._cached:
+            try:
+                with self.profile.stage('cache_write'):
+                    self.cache.put(self._key, self._entry)
+            except OSError:
+                # 缓存写入失败不影响转换
+                pass
+            self._cached = self._cached_keys()
+
+    def _cached_keys(self):
+        """条目中已有数据的sheet，用于判断关闭时是否需要写回缓存"""
+        return tuple(frozenset(self._entry[part]) for part in ('sheets', 'formulas', 'periods'))
+
+
+def format_size(size):
+    """将字节数格式化为显示文本"""
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="查看或清理报表解析缓存")
+    parser.add_argument('command', choices=['info', 'list', 'clear', 'prune'])
+    parser.add_argument('--dir', help="缓存目录，默认为 " + default_cache_dir())
+    parser.add_argument('--max-mb', type=float, default=DEFAULT_MAX_BYTES / 1024 / 1024,
+                        help="缓存大小上限（MB），用于 prune")
+    args = parser.parse_args(argv)
+    cache = ParseCache(args.dir, int(args.max_mb * 1024 * 1024))
+
+    if args.command == 'info':
+        entries = cache.entries()
+        print(f"缓存目录：{cache.directory}")
+        print(f"条目数：{len(entries)}")
+        print(f"总大小：{format_size(sum(size for _, size, _ in entries))}"
+              f" / 上限 {format_size(cache.max_bytes)}")
+    elif args.command == 'list':
+        for path, size, used in cache.entries():
+            print(f"{datetime.datetime.fromtimestamp(used):%Y-%m-%d %H:%M:%S}  "
+                  f"{format_size(size):>10}  {os.path.basename(path)}")
+    elif args.command == 'clear':
+        print(f"已删除 {cache.clear()} 个缓存条目")
+    else:
+        print(f"已删除 {cache.evict()} 个缓存条目")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""长表格式导出
+
+将转换后的报表和财务指标展开为长表，每行为
+(company, statement, item, 行次, period, value)，可写出为 CSV、JSON Lines 或 Parquet，
+供数据仓库直接加载，不需要再解析 Excel。
+写出器按批写入，批量转换时每个文件的数据写完即释放，不会在内存中累积。
+Parquet 格式需要安装 pyarrow。
+"""
+import csv
+import json
+import os
+
+from Rtotals import PERIODS
+
+# 长表的列
+LONG_COLUMNS = ('company', 'statement', 'item', '行次', 'period', 'value')
+
+# 财务指标在长表中的 statement 名称
+INDICATORS_STATEMENT = 'financial_indicators'
+
+
+def long_rows(company, processed_data, indicators=None):
+    """将一家公司的报表数据和财务指标展开为长表的行"""
+    for statement, template in processed_data.items():
+        for item_name, line, values in zip(template.names, template.registry.line_numbers, template.array.tolist()):
+            for period, value in zip(PERIODS, values):
+                yield (company, statement, item_name.strip(), line, period, value)
+    if indicators:
+        for period, values in indicators.items():
+            for indicator, value in values.items():
+                yield (company, INDICATORS_STATEMENT, indicator, None, period, float(value))
+
+
+class CsvLongWriter:
+    """CSV格式（UTF-8，第一行为列名）"""
+
+    def __init__(self, path):
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(LONG_COLUMNS)
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class JsonLinesLongWriter:
+    """JSON Lines格式（每行一个JSON对象）"""
+
+    def __init__(self, path):
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def write(self, rows):
+        self._file.writelines(
+            json.dumps(dict(zip(LONG_COLUMNS, row)), ensure_ascii=False) + '\n' for row in rows)
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetLongWriter:
+    """Parquet格式，每次 write 写为一个行组"""
+
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("导出Parquet格式需要安装pyarrow") from None
+        self._pa = pa
+        self._schema = pa.schema([
+            ('company', pa.string()),
+            ('statement', pa.string()),
+            ('item', pa.string()),
+            ('行次', pa.int32()),
+            ('period', pa.string()),
+            ('value', pa.float64())
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, rows):
+        columns = list(zip(*rows))
+        if not columns:
+            return
+        arrays = [self._pa.array(column, type=field.type) for column, field in zip(columns, self._schema)]
+        self._writer.write_table(self._pa.Table.from_arrays(arrays, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+# 格式名称 → 写出器
+LONG_FORMATS = {
+    'csv': CsvLongWriter,
+    'jsonl': JsonLinesLongWriter,
+    'parquet': ParquetLongWriter
+}
+
+# 文件扩展名 → 格式名称
+LONG_FORMAT_EXTENSIONS = {
+    '.csv': 'csv',
+    '.jsonl': 'jsonl',
+    '.json': 'jsonl',
+    '.parquet': 'parquet'
+}
+
+
+def long_format_for(path):
+    """根据文件扩展名判断长表格式，不是长表格式时返回None"""
+    return LONG_FORMAT_EXTENSIONS.get(os.path.splitext(path)[1].lower())
+
+
+def open_long_writer(path, fmt=None):
+    """打开长表写出器，未指定格式时按扩展名判断"""
+    fmt = fmt or long_format_for(path)
+    if fmt not in LONG_FORMATS:
+        raise ValueError(f"不支持的导出格式：{fmt or os.path.splitext(path)[1]}")
+    return LONG_FORMATS[fmt](path)
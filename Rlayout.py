@@ -0,0 +1,138 @@
+"""资产负债表布局分析
+
+资产负债表通常分为左右两侧：左侧为资产，右侧为负债和所有者权益，两侧各有自己的
+项目列和期间数值列。每张sheet只分析一次，根据表头结构和表体中文字单元格的分布
+找到两侧的项目列，再把左侧的期间列配对到右侧表头相同的列上，得到整数列号表示的
+提取计划，提取时不再逐行探测右侧项目列，也不再在列字母和列号之间转换。
+"""
+import re
+
+from openpyxl.utils import column_index_from_string, get_column_letter
+
+from Rtotals import PERIODS
+from Rperiods import HEADER_ROWS
+
+# 统计文字单元格时读取的表体行数
+SAMPLE_ROWS = 500
+
+# 右侧项目列至少要有的项目数（相对左侧项目列）
+MIN_RIGHT_LABEL_RATIO = 0.2
+MIN_RIGHT_LABELS = 3
+
+# 项目名称至少包含一个文字（"-"、"—"等占位符不算）
+_WORD = re.compile(r'[^\W\d_]')
+
+# 右侧项目列的表头关键字
+RIGHT_HEADER_KEYWORDS = ('负债', '权益')
+
+
+class ColumnPlan:
+    """提取计划
+
+    sides 为 [(项目列, {期间: 数值列或None})]，列号从1开始；单侧报表只有一项。
+    """
+
+    def __init__(self, sides):
+        self.sides = sides
+
+    @property
+    def value_columns(self):
+        """计划中用到的所有数值列"""
+        return sorted({col for _, columns in self.sides for col in columns.values() if col})
+
+    def describe(self):
+        """计划的说明文字"""
+        parts = []
+        for label_col, columns in self.sides:
+            periods = "，".join(f"{period} {get_column_letter(col)}"
+                               for period, col in columns.items() if col)
+            parts.append(f"项目列 {get_column_letter(label_col)}（{periods or '无期间列'}）")
+        return "；".join(parts)
+
+
+def column_numbers(selection):
+    """将 {期间: 列字母} 转换为 {期间: 列号}，未选择的期间为None"""
+    return {period: column_index_from_string(selection[period]) if selection.get(period) else None
+            for period in PERIODS}
+
+
+def _is_label(value):
+    """单元格是否像项目名称（包含文字的字符串，数字文本和占位符不算）"""
+    return isinstance(value, str) and _WORD.search(value) is not None
+
+
+def label_counts(sheet, start_row):
+    """统计表体中每列的项目名称数量 {列号: 数量}"""
+    counts = {}
+    for values in sheet.rows[start_row:start_row + SAMPLE_ROWS]:
+        for col, value in enumerate(values, start=1):
+            if _is_label(value) and col not in sheet.excluded_columns:
+                counts[col] = counts.get(col, 0) + 1
+    return counts
+
+
+def _header_texts(sheet, header_end):
+    """表头各列的文字 {列号: 文字}"""
+    texts = {}
+    for values in sheet.rows[:header_end]:
+        for col, value in enumerate(values, start=1):
+            if isinstance(value, str) and value.strip() and col not in sheet.excluded_columns:
+                texts.setdefault(col, []).append(value.strip())
+    return {col: " ".join(parts) for col, parts in texts.items()}
+
+
+def analyze_balance_layout(sheet, columns):
+    """分析资产负债表的左右两侧布局，返回 ColumnPlan
+
+    columns 为左侧的 {期间: 列号}。
+    """
+    value_cols = [col for col in columns.values() if col]
+    # 期间列中最后一个有文字的行为表头的最后一行，之后才是表体
+    header_end = 0
+    for row, values in enumerate(sheet.rows[:HEADER_ROWS], start=1):
+        if any(col <= len(values) and _is_label(values[col - 1]) for col in value_cols):
+            header_end = row
+    headers = _header_texts(sheet, header_end)
+    counts = label_counts(sheet, header_end)
+
+    # 左侧项目列：期间列左边项目最多的列（相同时靠左），找不到时为第一列
+    first_value = min(value_cols) if value_cols else sheet.max_column + 1
+    left_candidates = [col for col in counts if col < first_value]
+    left_label = max(left_candidates, key=lambda col: (counts[col], -col)) if left_candidates else 1
+    sides = [(left_label, dict(columns))]
+    if not value_cols:
+        return ColumnPlan(sides)
+
+    # 右侧项目列：左侧期间列右边的列，表头含"负债"/"权益"的优先，否则取项目最多的列
+    last_value = max(value_cols)
+    minimum = max(MIN_RIGHT_LABELS, counts.get(left_label, 0) * MIN_RIGHT_LABEL_RATIO)
+    right_candidates = [col for col in counts if col > last_value and counts[col] >= minimum]
+    if not right_candidates:
+        return ColumnPlan(sides)
+    headed = [col for col in right_candidates
+              if any(keyword in headers.get(col, '') for keyword in RIGHT_HEADER_KEYWORDS)]
+    right_label = min(headed) if headed else max(right_candidates, key=lambda col: (counts[col], -col))
+
+    # 右侧期间列：右侧项目列之后表头与左侧相同的列，没有时保持与左侧相同的相对位置
+    right_columns = {}
+    used = set()
+    for period in PERIODS:
+        col = columns.get(period)
+        if not col:
+            right_columns[period] = None
+            continue
+        paired = None
+        if headers.get(col):
+            for candidate in sorted(headers):
+                if candidate > right_label and candidate not in used and headers[candidate] == headers[col]:
+                    paired = candidate
+                    break
+        if paired is None:
+            paired = right_label + (col - left_label)
+            if paired > sheet.max_column or paired in sheet.excluded_columns:
+                paired = None
+        if paired is not None:
+            used.add(paired)
+        right_columns[period] = paired
+    sides.append((right_label, right_columns))
+    return ColumnPlan(sides)
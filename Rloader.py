@@ -0,0 +1,383 @@
+"""工作簿加载
+
+使用 openpyxl 的只读模式按需流式读取所选的sheet，每个sheet只保存为紧凑的值网格，
+不再为整个文件构建两份完整的单元格对象。
+.xls 文件由 xlrd 按需加载所选的sheet，直接转换为同样的值网格，不再生成临时的 .xlsx 文件。
+"""
+import os
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+import openpyxl
+import pandas as pd
+from openpyxl.utils import column_index_from_string
+
+from Rprofile import NULL_PROFILE
+
+
+class SheetGrid:
+    """sheet的值网格，行列编号与Excel一致（从1开始）"""
+
+    def __init__(self, title, rows):
+        self.title = title
+        # 每行是去掉了末尾空单元格的元组
+        self.rows = rows
+        self.max_row = len(rows)
+        self.max_column = max((len(row) for row in rows), default=0)
+        # 预处理时排除的列（列号），这些列保留在网格中，只是不参与识别和提取
+        self.excluded_columns = frozenset()
+
+    def cell_count(self):
+        """网格中保存的单元格数"""
+        return sum(len(row) for row in self.rows)
+
+    def value(self, row, col):
+        """获取单元格的值，超出范围时返回None"""
+        if row < 1 or row > self.max_row:
+            return None
+        values = self.rows[row - 1]
+        if col < 1 or col > len(values):
+            return None
+        return values[col - 1]
+
+    def frame(self, columns):
+        """将指定的列一次性读取为DataFrame
+
+        行索引为Excel行号，列名为Excel列号，超出已使用区域的单元格为None。
+        只取出指定的列，不会先按整个网格的宽度构建。
+        """
+        data = {col: [values[col - 1] if 0 < col <= len(values) else None for values in self.rows]
+                for col in columns}
+        return pd.DataFrame(data, index=range(1, self.max_row + 1), columns=list(columns), dtype=object)
+
+    @classmethod
+    def from_worksheet(cls, worksheet):
+        """从只读worksheet流式读取已使用区域"""
+        return cls.from_rows(worksheet.title, worksheet.iter_rows(values_only=True))
+
+    @classmethod
+    def from_rows(cls, title, row_values):
+        """从逐行的单元格值构建网格，去掉行尾的空单元格和末尾的空行"""
+        rows = []
+        last_used = 0
+        for values in row_values:
+            # 去掉行尾的空单元格
+            end = len(values)
+            while end and values[end - 1] is None:
+                end -= 1
+            rows.append(tuple(values[:end]))
+            if end:
+                last_used = len(rows)
+        # 去掉因格式设置而产生的末尾空行
+        del rows[last_used:]
+        return cls(title, rows)
+
+
+class WorkbookDocument:
+    """一次转换所加载的工作簿
+
+    只在打开时读取sheet名称，sheet的数据在首次访问时才流式读取并缓存。
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        # 数据版本，用于获取普通数据
+        self._workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        # 公式版本，只在需要回退到公式时才加载
+        self._formula_workbook = None
+        self.sheet_names = list(self._workbook.sheetnames)
+        self._sheets = {}
+        # sheet名 → 含有公式的单元格坐标，第一次需要时才扫描
+        self._formula_cells = {}
+        self._formula_indexes = {}
+        # (sheet类型, sheet名) → 期间列识别结果，sheet类型 → {原表项目: 模板项目} 及
+        # {原表项目: 匹配方式}，由流水线填写
+        self.period_detections = {}
+        self.label_matches = {}
+        self.match_methods = {}
+        # 本次转换的性能记录（Rprofile），由流水线在加载时设置
+        self.profile = NULL_PROFILE
+
+    def sheet(self, sheet_name):
+        """获取sheet的值网格"""
+        if sheet_name not in self._sheets:
+            with self.profile.stage('read_sheet'):
+                worksheet = self._workbook[sheet_name]
+                self._sheets[sheet_name] = SheetGrid.from_worksheet(worksheet)
+            _count_sheet(self.profile, self._sheets[sheet_name])
+        return self._sheets[sheet_name]
+
+    def formula_cells(self, sheet_name):
+        """sheet中含有公式的单元格坐标集合，无法确定时为None
+
+        只在有匹配到的单元格没有值时才需要，第一次调用时流式扫描工作表XML。
+        """
+        if sheet_name not in self._formula_cells:
+            self._formula_cells[sheet_name] = find_formula_cells(self.file_path, sheet_name, self.profile)
+        return self._formula_cells[sheet_name]
+
+    def formula_index(self, sheet_name, columns):
+        """获取sheet中指定列的公式索引
+
+        索引在第一次查询时才扫描，没有缺失缓存值的公式单元格的文件不会加载公式版本。
+        """
+        key = (sheet_name, tuple(sorted(set(columns))))
+        if key not in self._formula_indexes:
+            self._formula_indexes[key] = FormulaIndex(self, sheet_name, key[1])
+        return self._formula_indexes[key]
+
+    def formula_worksheet(self, sheet_name):
+        """获取公式版本的只读worksheet"""
+        if self._formula_workbook is None:
+            self._formula_workbook = openpyxl.load_workbook(self.file_path, read_only=True)
+        return self._formula_workbook[sheet_name]
+
+    def close(self):
+        """关闭只读工作簿占用的文件"""
+        for workbook in (self._workbook, self._formula_workbook):
+            if workbook is not None:
+                workbook.close()
+        self._formula_workbook = None
+
+
+# 流式扫描工作表XML时每次读取的字节数
+FORMULA_SCAN_CHUNK_SIZE = 1024 * 1024
+
+# 工作表XML的根元素，用于确定元素的命名空间前缀
+_ROOT_ELEMENT = re.compile(rb'<(\w+:)?worksheet\b')
+# 单元格的 r 属性
+_CELL_REFERENCE = re.compile(rb'\sr="([A-Za-z]{1,3})(\d+)"')
+
+
+def find_formula_cells(file_path, sheet_name, profile=NULL_PROFILE):
+    """找出 .xlsx 文件中某个sheet含有公式的单元格坐标
+
+    数据版本不会读出公式，这里直接从压缩包中流式读取工作表XML，不打开工作簿。
+    .xls 中的公式都有计算结果，返回空集合；无法确定时返回None（回退到按需扫描公式版本）。
+    """
+    if os.path.splitext(file_path)[1].lower() == '.xls':
+        return frozenset()
+    with profile.stage('extract.read_values.formulas.find'):
+        try:
+            with zipfile.ZipFile(file_path) as archive:
+                member = _sheet_member(archive, sheet_name)
+                if member is None:
+                    return None
+                with archive.open(member) as stream:
+                    cells = scan_formula_cells(stream)
+        except (zipfile.BadZipFile, KeyError, OSError, ET.ParseError):
+            return None
+    if cells is not None:
+        profile.count('formula_cells_found', len(cells))
+    return cells
+
+
+def _sheet_member(archive, sheet_name):
+    """按 包关系 → 工作簿 → 工作簿关系 找到sheet在压缩包中的路径，找不到时返回None"""
+    workbook = _relationship_targets(archive, '')
+    workbook = next((target for kind, target in workbook.values() if kind.endswith('/officeDocument')), None)
+    if workbook is None:
+        return None
+    relationships = _relationship_targets(archive, workbook)
+    for element in ET.fromstring(archive.read(workbook)).iter():
+        if _local_name(element.tag) == 'sheet' and element.get('name') == sheet_name:
+            for attribute, value in element.attrib.items():
+                # r:id，严格模式的文件使用不同的命名空间
+                if attribute.startswith('{') and _local_name(attribute) == 'id' and value in relationships:
+                    return relationships[value][1]
+    return None
+
+
+def _relationship_targets(archive, part):
+    """读取部件的关系文件，返回 {关系ID: (类型, 压缩包中的路径)}"""
+    folder, name = posixpath.split(part)
+    targets = {}
+    for element in ET.fromstring(archive.read(posixpath.join(folder, '_rels', name + '.rels'))):
+        target = element.get('Target', '')
+        if target.startswith('/'):
+            target = target[1:]
+        else:
+            target = posixpath.normpath(posixpath.join(folder, target))
+        targets[element.get('Id')] = (element.get('Type', ''), target)
+    return targets
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def scan_formula_cells(stream, chunk_size=FORMULA_SCAN_CHUNK_SIZE):
+    """找出工作表XML中含有公式的单元格坐标
+
+    按块读取，只查找公式元素，不解析整个XML；每块在最后一个单元格的开始处截断，
+    剩余部分与下一块拼接，内存占用与文件大小无关。
+    有公式单元格的位置无法确定时（如缺少 r 属性）返回None。
+    """
+    cells = set()
+    data = stream.read(chunk_size)
+    root = _ROOT_ELEMENT.search(data)
+    if root is None:
+        return None
+    prefix = root.group(1) or b''
+    cell_start = b'<' + prefix + b'c '
+    cell_end = b'</' + prefix + b'c>'
+    formula_element = re.compile(b'<' + re.escape(prefix) + rb'f\b')
+    while True:
+        chunk = stream.read(chunk_size)
+        if chunk:
+            # 截断处之前的单元格都是完整的
+            cut = data.rfind(cell_start)
+            if cut < 0:
+                cut = data.rfind(b'<')
+            if cut < 0:
+                cut = len(data)
+        else:
+            cut = len(data)
+        for match in formula_element.finditer(data, 0, cut):
+            start = data.rfind(cell_start, 0, match.start())
+            end = data.find(b'>', start)
+            # 找到的单元格必须包含这个公式元素
+            if start < 0 or data[end - 1:end] == b'/' or data.find(cell_end, end) < match.start():
+                return None
+            reference = _CELL_REFERENCE.search(data, start, end)
+            if reference is None:
+                return None
+            cells.add((int(reference.group(2)), column_index_from_string(reference.group(1).decode().upper())))
+        if not chunk:
+            return frozenset(cells)
+        data = data[cut:] + chunk
+
+
+def _count_sheet(profile, sheet):
+    """记录从原文件读取的sheet的行数和单元格数"""
+    if profile.enabled:
+        profile.count('sheets_read')
+        profile.count('rows_read', sheet.max_row)
+        profile.count('cells_read', sheet.cell_count())
+
+
+def open_document(file_path):
+    """按扩展名打开工作簿"""
+    if os.path.splitext(file_path)[1].lower() == '.xls':
+        return XlsWorkbookDocument(file_path)
+    return WorkbookDocument(file_path)
+
+
+class XlsWorkbookDocument:
+    """.xls 格式的工作簿
+
+    使用 xlrd 的按需加载模式，打开时只读取sheet名称，sheet在首次访问时才解析，
+    转换为值网格后立即释放。.xls 中的公式总是保存了计算结果，因此不需要公式索引。
+    """
+
+    def __init__(self, file_path):
+        import xlrd
+        self.file_path = file_path
+        self._book = xlrd.open_workbook(file_path, on_demand=True)
+        self.sheet_names = list(self._book.sheet_names())
+        self._sheets = {}
+        self.period_detections = {}
+        self.label_matches = {}
+        self.match_methods = {}
+        # 本次转换的性能记录（Rprofile），由流水线在加载时设置
+        self.profile = NULL_PROFILE
+
+    def sheet(self, sheet_name):
+        """获取sheet的值网格"""
+        if sheet_name not in self._sheets:
+            with self.profile.stage('read_sheet'):
+                worksheet = self._book.sheet_by_name(sheet_name)
+                rows = (_xls_row_values(worksheet, row) for row in range(worksheet.nrows))
+                self._sheets[sheet_name] = SheetGrid.from_rows(sheet_name, rows)
+                self._book.unload_sheet(sheet_name)
+            _count_sheet(self.profile, self._sheets[sheet_name])
+        return self._sheets[sheet_name]
+
+    def formula_cells(self, sheet_name):
+        """.xls 中的公式都有计算结果，没有需要回退计算的单元格"""
+        return frozenset()
+
+    def formula_index(self, sheet_name, columns):
+        """.xls 没有需要回退计算的公式，返回空的公式索引"""
+        return FormulaIndex(self, sheet_name, ())
+
+    def close(self):
+        """释放xlrd占用的资源"""
+        self._book.release_resources()
+
+
+def _xls_row_values(worksheet, row):
+    """获取.xls中一行的单元格值，空单元格和错误值为None"""
+    import xlrd
+    values = []
+    for cell_type, value in zip(worksheet.row_types(row), worksheet.row_values(row)):
+        if cell_type in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK, xlrd.XL_CELL_ERROR):
+            values.append(None)
+        elif cell_type == xlrd.XL_CELL_BOOLEAN:
+            values.append(bool(value))
+        else:
+            values.append(value)
+    return tuple(values)
+
+
+class FormulaIndex:
+    """sheet中若干列的 坐标 → 公式 索引
+
+    只有在公式单元格没有缓存值时才会被查询，第一次查询时扫描一遍这些列并建立索引，
+    之后每次查询都是一次字典查找。哪些单元格是公式（cells）在第一次遇到没有值的单元格时
+    才从工作表XML中找出，普通的空单元格不会触发公式版本的扫描。
+    """
+
+    def __init__(self, document, sheet_name, columns):
+        self.document = document
+        self.sheet_name = sheet_name
+        self.columns = columns
+        self._cells_found = False
+        self._cells = None
+        self._formulas = None
+
+    @property
+    def cells(self):
+        """含有公式的单元格坐标，无法确定时为None"""
+        if not self._cells_found:
+            self._cells = self.document.formula_cells(self.sheet_name)
+            self._cells_found = True
+        return self._cells
+
+    def is_formula(self, row, col):
+        """单元格是否可能是公式（无法确定时按索引范围内的都可能是公式处理）"""
+        if self.cells is None:
+            return col in self.columns
+        return (row, col) in self.cells
+
+    @property
+    def formulas(self):
+        if self._formulas is None:
+            profile = self.document.profile
+            with profile.stage('extract.read_values.formulas.scan'):
+                self._formulas = self._scan()
+            profile.count('formula_cells_indexed', len(self._formulas))
+        return self._formulas
+
+    def _scan(self):
+        """扫描公式版本中的指定列"""
+        formulas = {}
+        if not self.columns:
+            return formulas
+        min_col = self.columns[0]
+        worksheet = self.document.formula_worksheet(self.sheet_name)
+        for row, values in enumerate(worksheet.iter_rows(min_col=min_col,
+                                                         max_col=self.columns[-1],
+                                                         values_only=True), start=1):
+            for col in self.columns:
+                offset = col - min_col
+                if offset < len(values):
+                    value = values[offset]
+                    if isinstance(value, str) and value.startswith('='):
+                        formulas[(row, col)] = value
+        return formulas
+
+    def get(self, row, col):
+        """获取单元格的公式，不是公式时返回None"""
+        return self.formulas.get((row, col))
@@ -0,0 +1,131 @@
+"""日志
+
+LogSink 是线程安全的日志缓冲：低于当前级别的日志在 emit 中直接丢弃，
+其它日志只追加到有上限的队列中。界面由 TextLogView 定时批量写入 Text 控件，
+并只保留最近的若干行；批量转换可以用 JsonLogWriter 在后台线程中写入JSON行文件。
+"""
+import datetime
+import json
+import queue
+import threading
+from collections import deque
+
+# 日志级别，数字越大越重要
+LOG_LEVELS = {
+    'DEBUG': 10,
+    'INFO': 20,
+    'SUCCESS': 25,
+    'WARNING': 30,
+    'ERROR': 40
+}
+
+# 界面日志的刷新间隔（毫秒）
+FLUSH_INTERVAL_MS = 100
+
+# 界面上最多保留的日志行数
+MAX_LOG_LINES = 2000
+
+
+def level_number(level):
+    """获取日志级别对应的数字，未知级别按INFO处理"""
+    return LOG_LEVELS.get(level, LOG_LEVELS['INFO'])
+
+
+class LogSink:
+    """线程安全、有上限的日志缓冲"""
+
+    def __init__(self, level='INFO', capacity=MAX_LOG_LINES):
+        self.set_level(level)
+        # 尚未显示的日志，超过上限时丢弃最早的（反正也会被界面裁掉）
+        self._pending = deque(maxlen=capacity)
+
+    def set_level(self, level):
+        self.level = level
+        self._level_number = level_number(level)
+
+    def enabled(self, level):
+        """该级别的日志是否会被记录"""
+        return level_number(level) >= self._level_number
+
+    def emit(self, message, level="INFO"):
+        """记录一条日志（可在任意线程中调用）"""
+        if level_number(level) < self._level_number:
+            return
+        self._pending.append((datetime.datetime.now(), level, message))
+
+    def drain(self):
+        """取出所有尚未显示的日志"""
+        records = []
+        while True:
+            try:
+                records.append(self._pending.popleft())
+            except IndexError:
+                return records
+
+
+def format_record(record):
+    """格式化一条日志"""
+    time, level, message = record
+    return f"[{time:%Y-%m-%d %H:%M:%S}] [{level}] {message}\n"
+
+
+class TextLogView:
+    """定时把日志缓冲中的日志批量写入 Text 控件
+
+    每批日志只做一次插入、一次裁剪和一次滚动，控件中最多保留 max_lines 行。
+    """
+
+    def __init__(self, text, sink, max_lines=MAX_LOG_LINES, interval_ms=FLUSH_INTERVAL_MS):
+        self.text = text
+        self.sink = sink
+        self.max_lines = max_lines
+        self.interval_ms = interval_ms
+
+    def start(self):
+        """开始定时刷新"""
+        self.flush()
+        self.text.after(self.interval_ms, self.start)
+
+    def flush(self):
+        """把缓冲中的日志写入控件"""
+        records = self.sink.drain()
+        if not records:
+            return
+        # Text.insert 可以一次插入多段带标签的文本
+        chunks = []
+        for record in records:
+            chunks.extend((format_record(record), record[1]))
+        self.text.configure(state='normal')
+        self.text.insert('end', *chunks)
+        lines = int(self.text.index('end-1c').split('.')[0]) - 1
+        if lines > self.max_lines:
+            self.text.delete('1.0', f'{lines - self.max_lines + 1}.0')
+        self.text.see('end')
+        self.text.configure(state='disabled')
+
+
+class JsonLogWriter:
+    """在后台线程中把日志写入JSON行文件"""
+
+    def __init__(self, path):
+        self._queue = queue.Queue()
+        self._file = open(path, 'a', encoding='utf-8')
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, record):
+        """写入一条日志，record 为可以序列化为JSON的字典"""
+        self._queue.put(record)
+
+    def _run(self):
+        while True:
+            record = self._queue.get()
+            if record is None:
+                break
+            self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.close()
+
+    def close(self):
+        """写完所有日志后关闭文件"""
+        self._queue.put(None)
+        self._thread.join()
@@ -0,0 +1,200 @@
+"""客户项目对应关系
+
+每个客户的报表都有自己习惯的项目写法。确认过的 原表项目 → 模板项目 对应关系
+按客户保存在本地的SQLite数据库中，下次转换同一客户的报表时先按原表项目原文直接查找，
+命中的项目不再经过标准化、同义词和模糊匹配。确认不对应任何模板项目的原表项目
+（如表头、空行说明）也会保存，模板项目为空字符串，下次直接跳过。
+
+命令行用法：
+    python Rmapping.py customers                  列出客户及对应关系数量
+    python Rmapping.py show 客户                   显示某个客户的对应关系
+    python Rmapping.py export 文件.json [--customer 客户]
+    python Rmapping.py import 文件.json [--replace]
+    python Rmapping.py delete 客户 [--statement 报表] [--label 原表项目]
+"""
+import argparse
+import datetime
+import json
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import closing
+
+# 数据库结构版本
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS label_mappings (
+    customer TEXT NOT NULL,
+    statement TEXT NOT NULL,
+    label TEXT NOT NULL,
+    template_item TEXT NOT NULL,
+    confirmed_at TEXT NOT NULL,
+    PRIMARY KEY (customer, statement, label)
+)
+"""
+
+
+def default_mapping_path():
+    """默认数据库路径，可以通过环境变量 REPORT_MAPPING_DB 指定"""
+    if os.environ.get('REPORT_MAPPING_DB'):
+        return os.environ['REPORT_MAPPING_DB']
+    base = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.local', 'share')
+    return os.path.join(base, 'report-conversion-tool', 'label_mappings.db')
+
+
+class MappingStore:
+    """按客户保存的项目对应关系
+
+    每个 (客户, 报表) 的对应关系在第一次使用时整体读入字典，之后每次查找都是一次字典查找。
+    每次数据库操作都使用独立的连接，可以在后台线程和多个进程中使用。
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_mapping_path()
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute(_SCHEMA)
+        connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        return connection
+
+    def mappings(self, customer, statement):
+        """返回某个客户某张报表的 {原表项目: 模板项目}"""
+        key = (customer, statement)
+        with self._lock:
+            if key not in self._loaded:
+                with closing(self._connect()) as connection:
+                    self._loaded[key] = dict(connection.execute(
+                        "SELECT label, template_item FROM label_mappings "
+                        "WHERE customer = ? AND statement = ?", key))
+            return self._loaded[key]
+
+    def lookup(self, customer, statement, label):
+        """查找原表项目对应的模板项目，没有保存时返回None"""
+        return self.mappings(customer, statement).get(label)
+
+    def record(self, customer, statement, mappings):
+        """保存确认的对应关系 {原表项目: 模板项目}，返回新增或修改的条数"""
+        known = self.mappings(customer, statement)
+        changed = {label: item for label, item in mappings.items() if known.get(label) != item}
+        if not changed:
+            return 0
+        now = datetime.datetime.now().isoformat(timespec='seconds')
+        with closing(self._connect()) as connection, connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO label_mappings VALUES (?, ?, ?, ?, ?)",
+                [(customer, statement, label, item, now) for label, item in changed.items()])
+        with self._lock:
+            known.update(changed)
+        return len(changed)
+
+    def forget(self, customer, statement=None, label=None):
+        """删除对应关系，返回删除的条数"""
+        conditions = ["customer = ?"]
+        params = [customer]
+        if statement is not None:
+            conditions.append("statement = ?")
+            params.append(statement)
+        if label is not None:
+            conditions.append("label = ?")
+            params.append(label)
+        with closing(self._connect()) as connection, connection:
+            deleted = connection.execute(
+                "DELETE FROM label_mappings WHERE " + " AND ".join(conditions), params).rowcount
+        with self._lock:
+            for key in [key for key in self._loaded if key[0] == customer]:
+                del self._loaded[key]
+        return deleted
+
+    def customers(self):
+        """返回 [(客户, 对应关系条数)]"""
+        with closing(self._connect()) as connection:
+            return connection.execute(
+                "SELECT customer, COUNT(*) FROM label_mappings GROUP BY customer ORDER BY customer"
+            ).fetchall()
+
+    def records(self, customer=None):
+        """返回对应关系记录的字典列表，可以只返回某个客户的"""
+        query = "SELECT customer, statement, label, template_item, confirmed_at FROM label_mappings"
+        params = ()
+        if customer is not None:
+            query += " WHERE customer = ?"
+            params = (customer,)
+        query += " ORDER BY customer, statement, label"
+        with closing(self._connect()) as connection:
+            rows = connection.execute(query, params).fetchall()
+        fields = ('customer', 'statement', 'label', 'template_item', 'confirmed_at')
+        return [dict(zip(fields, row)) for row in rows]
+
+    def export_mappings(self, path, customer=None):
+        """将对应关系导出为JSON文件，返回导出的条数"""
+        records = self.records(customer)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'version': SCHEMA_VERSION, 'mappings': records}, f, ensure_ascii=False, indent=1)
+        return len(records)
+
+    def import_mappings(self, path, replace=False):
+        """从JSON文件导入对应关系，返回导入的条数
+
+        replace 为 True 时先删除文件中涉及的客户原有的对应关系。
+        """
+        with open(path, encoding='utf-8') as f:
+            records = json.load(f)['mappings']
+        now = datetime.datetime.now().isoformat(timespec='seconds')
+        rows = [(record['customer'], record['statement'], record['label'], record['template_item'],
+                 record.get('confirmed_at') or now) for record in records]
+        with closing(self._connect()) as connection, connection:
+            if replace:
+                connection.executemany("DELETE FROM label_mappings WHERE customer = ?",
+                                       [(customer,) for customer in {row[0] for row in rows}])
+            connection.executemany("INSERT OR REPLACE INTO label_mappings VALUES (?, ?, ?, ?, ?)", rows)
+        with self._lock:
+            self._loaded.clear()
+        return len(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="管理客户项目对应关系")
+    parser.add_argument('--db', help="数据库路径，默认为 " + default_mapping_path())
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('customers', help="列出客户及对应关系数量")
+    show = commands.add_parser('show', help="显示某个客户的对应关系")
+    show.add_argument('customer')
+    export = commands.add_parser('export', help="导出为JSON文件")
+    export.add_argument('file')
+    export.add_argument('--customer', help="只导出该客户")
+    import_ = commands.add_parser('import', help="从JSON文件导入")
+    import_.add_argument('file')
+    import_.add_argument('--replace', action='store_true', help="先删除文件中涉及的客户原有的对应关系")
+    delete = commands.add_parser('delete', help="删除对应关系")
+    delete.add_argument('customer')
+    delete.add_argument('--statement', help="只删除该报表（balance_sheet / cash_flow / income_statement）")
+    delete.add_argument('--label', help="只删除该原表项目")
+    args = parser.parse_args(argv)
+    store = MappingStore(args.db)
+
+    if args.command == 'customers':
+        for customer, count in store.customers():
+            print(f"{customer}\t{count}")
+    elif args.command == 'show':
+        for record in store.records(args.customer):
+            item = record['template_item'].strip() or "（不对应）"
+            print(f"{record['statement']}\t{record['label']} → {item}\t{record['confirmed_at']}")
+    elif args.command == 'export':
+        print(f"已导出 {store.export_mappings(args.file, args.customer)} 条对应关系")
+    elif args.command == 'import':
+        print(f"已导入 {store.import_mappings(args.file, args.replace)} 条对应关系")
+    else:
+        print(f"已删除 {store.forget(args.customer, args.statement, args.label)} 条对应关系")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
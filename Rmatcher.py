@@ -0,0 +1,646 @@
+"""项目名称匹配
+
+match_item_name 是逐对比较的原始匹配规则；LabelMatcher 把一组模板名称和
+同义词预先编译成哈希索引，查找一个原表项目的候选模板只需一次标准化和一次字典查找，
+结果与按模板顺序逐个调用 match_item_name 完全一致。FuzzyIndex 为模糊匹配建立
+模板写法的n元组索引。StatementMatcher 用这两个索引对一张报表的所有项目打分并做全局分配。
+"""
+import re
+import unicodedata
+from functools import lru_cache
+import numpy as np
+
+
+# match_item_name 使用的同义词（标准名称: 各种写法）
+MATCH_SYNONYMS = {
+    # 资产类
+    '流动资产': ['流动资产', '流动资产：', '流动资产合计', '流动资产总计'],
+    '非流动资产': ['非流动资产', '非流动资产：', '非流动资产合计', '非流动资产总计'],
+    '资产总计': ['资产总计', '资产合计', '资产总额'],
+
+    # 负债类
+    '流动负债': ['流动负债', '流动负债：', '流动负债合计', '流动负债总计'],
+    '非流动负债': ['非流动负债', '非流动负债：', '非流动负债合计', '非流动负债总计'],
+    '负债合计': ['负债合计', '负债总计', '负债总额'],
+
+    # 所有者权益类
+    '所有者权益': ['所有者权益', '所有者权益（或股东权益）', '所有者权益（或股东权益）：', '股东权益'],
+    '所有者权益合计': ['所有者权益合计', '所有者权益（或股东权益）合计', '股东权益合计', '所有者权益总计'],
+    '负债和所有者权益总计': ['负债和所有者权益总计', '负债和所有者权益（或股东权益）总计', '负债及所有者权益总计', '负债和股东权益总计'],
+
+    # 具体项目
+    '预提费用': ['预提费用', '预提成本费用', '预提支出'],
+    '应付股利': ['应付股利', '应付股息', '应付利息及应付股利'],
+    '递延所得税负债': ['递延所得税负债', '递延税负债', '递延所得税'],
+    '应付票据': ['应付票据', '应付汇票', '应付票据及应付账款'],
+    '资本公积': ['资本公积', '资本公积金', '资本溢价'],
+    '其他应付款': ['其他应付款', '其它应付款', '其他应付'],
+    '一年内到期的非流动负债': ['一年内到期的非流动负债', '一年内到期非流动负债', '一年内到期长期负债'],
+    '其他长期资产': ['其他长期资产', '其它长期资产', '其他非流动资产'],
+    '应付债券': ['应付债券', '债券', '应付债券净额'],
+    '固定资产清理': ['固定资产清理', '固定资产清算', '资产清理'],
+    '专项应付款': ['专项应付款', '专项款', '专项应付'],
+    '应付账款': ['应付账款', '应付款项', '应付票据及应付账款'],
+    '长期借款': ['长期借款', '长期贷款', '长期债务'],
+    '应付职工薪酬': ['应付职工薪酬', '应付工资', '工资福利', '应付工资薪酬'],
+    '少数股东权益': ['少数股东权益', '少数股东', '少数股东权益合计'],
+    '其他流动负债': ['其他流动负债', '其它流动负债', '其他流动'],
+    '交易性金融负债': ['交易性金融负债', '以公允价值计量且其变动计入当期损益的金融负债', '交易性负债'],
+    '持有至到期投资': ['持有至到期投资', '持有到期投资', '持有至到期'],
+    '应交税费': ['应交税费', '应交税金', '应缴税金', '应交税款'],
+    '未结清对外担保余额': ['未结清对外担保余额', '对外担保余额', '担保余额'],
+    '其他非流动负债': ['其他非流动负债', '其它非流动负债', '其他长期负债'],
+    '短期借款': ['短期借款', '短期贷款', '短期债务'],
+    '股本': ['股本', '实收资本', '实收资本(或股本)', '注册资本'],
+    '应付利息': ['应付利息', '应付利息费用', '应付利息及应付股利'],
+    '可供出售金融资产': ['可供出售金融资产', '可供出售的金融资产', '可供出售投资'],
+    '盈余公积': ['盈余公积', '盈余公积金', '法定盈余'],
+    '未分配利润': ['未分配利润', '未分配利润(未弥补亏损)', '留存收益', '累计利润'],
+    '长期待摊费用': ['长期待摊费用', '待摊费用', '长期待摊', '待摊'],
+    '预计负债': ['预计负债', '预计债务', '预提负债'],
+    '长期应付款': ['长期应付款', '长期应付款项', '长期应付'],
+    '预收款项': ['预收款项', '预收账款', '预收款', '合同负债'],
+    '库存股': ['库存股', '减：库存股', '库存股份'],
+    '工程物资': ['工程物资', '工程材料', '工程用料']
+}
+
+
+def match_item_name(source_name, template_name):
+    """匹配项目名称"""
+    if not source_name or not template_name:
+        return False
+
+    # 清理和标准化名称
+    source_name = clean_item_name(source_name)
+    template_name = clean_item_name(template_name)
+
+    # 如果清理后为空，返回False
+    if not source_name or not template_name:
+        return False
+
+    # 标准化处理
+    source_name = source_name.lower()
+    template_name = template_name.lower()
+
+    # 移除前缀空格和冒号
+    source_name = source_name.lstrip().lstrip('    ').rstrip(':：')
+    template_name = template_name.lstrip().lstrip('    ').rstrip(':：')
+
+    # 直接匹配
+    if source_name == template_name:
+        return True
+
+
+    # 同义词匹配
+    for standard, variants in MATCH_SYNONYMS.items():
+        if source_name in variants or template_name in variants:
+            if source_name in variants and template_name in variants:
+                return True
+            if source_name == standard and template_name in variants:
+                return True
+            if template_name == standard and source_name in variants:
+                return True
+
+    return False
+
+
+# clean_item_name 中直接删除的标点
+_CLEAN_REMOVE = str.maketrans('', '', ':：()（）、，,；;"［］[]【】｛｝{}…')
+
+# 删除连续的点号后统一的字符（"。"和"="在点号之后删除）
+_CLEAN_REPLACE = str.maketrans({
+    '。': None,
+    '=': None,
+    '－': '-',
+    '—': '-',
+    '＋': '+',
+    '／': '/'
+})
+
+# 连续的点号：每两个删除一对，只剩奇数个时保留一个
+_CLEAN_DOTS = re.compile(r'\.{2,}')
+
+# 前导的数字、点号以及一、二、三等中文序号
+_CLEAN_LEADING = re.compile(r'^[\s\d.]*(?:[一二三四五六七八九十]+[、\s.])?')
+
+# standardize_name 删除的括号内容，依次处理
+_STANDARDIZE_BRACKETS = [re.compile(pattern) for pattern in (
+    r'［.*?］', r'\[.*?\]', r'【.*?】', r'\(.*?\)', r'（.*?）'
+)]
+
+# standardize_name 删除的序号前缀，依次处理
+_STANDARDIZE_NUMBERING = [re.compile(pattern) for pattern in (
+    r'^[一二三四五六七八九十]+、', r'^[0-9]+、', r'^[A-Za-z]+、'
+)]
+
+_STANDARDIZE_AFFIXES = ['合计', '小计', '合计：', '小计：', '：', ':', '总计', '总额']
+
+# 项目名称缓存的默认容量，同一批文件中的项目名称大量重复
+LABEL_CACHE_SIZE = 4096
+
+
+def _odd_dots(match):
+    return '.' * (len(match.group()) % 2)
+
+
+def _clean_item_name(name):
+    # 移除所有空格（包括前导空格、尾随空格和中间空格）并删除特殊字符
+    name = ''.join(name.split()).translate(_CLEAN_REMOVE)
+
+    # 全角字母、数字和兼容字符统一为半角（NFKC）
+    if not name.isascii() and not unicodedata.is_normalized('NFKC', name):
+        name = ''.join(unicodedata.normalize('NFKC', name).split()).translate(_CLEAN_REMOVE)
+
+    # 连续的点号，统一中文符号
+    if '..' in name:
+        name = _CLEAN_DOTS.sub(_odd_dots, name)
+    name = name.translate(_CLEAN_REPLACE)
+
+    # 移除前导的层级标记和空格
+    return _CLEAN_LEADING.sub('', name, count=1).strip()
+
+
+def _standardize_name(name):
+    # 移除前导空格和层级标记
+    name = name.strip()
+
+    # 移除常见的前缀和后缀
+    for affix in _STANDARDIZE_AFFIXES:
+        if name.startswith(affix):
+            name = name[len(affix):]
+        if name.endswith(affix):
+            name = name[:-len(affix)]
+
+    # 统一括号内的内容
+    for pattern in _STANDARDIZE_BRACKETS:
+        name = pattern.sub('', name)
+
+    # 移除其他特殊标记
+    name = name.replace('…', '').replace('——', '').replace('--', '')
+
+    # 处理特殊的前缀
+    for pattern in _STANDARDIZE_NUMBERING:
+        name = pattern.sub('', name)
+
+    # 移除"减："前缀
+    if name.startswith('减：'):
+        name = name[2:]
+
+    return name.strip()
+
+
+def _normalize_label(name):
+    return _label_caches['clean_item_name'](name).lower().rstrip(':：')
+
+
+_CACHED_FUNCTIONS = {
+    'clean_item_name': _clean_item_name,
+    'standardize_name': _standardize_name,
+    'normalize_label': _normalize_label
+}
+
+_label_caches = {}
+
+
+def configure_label_cache(maxsize=LABEL_CACHE_SIZE):
+    """设置项目名称缓存的容量（会清空已有缓存），maxsize为None时不限容量"""
+    for name, func in _CACHED_FUNCTIONS.items():
+        _label_caches[name] = lru_cache(maxsize=maxsize)(func)
+
+
+def label_cache_stats():
+    """返回各项目名称缓存的命中统计，用于确定缓存容量"""
+    stats = {}
+    for name, cached in _label_caches.items():
+        info = cached.cache_info()
+        lookups = info.hits + info.misses
+        stats[name] = {
+            'hits': info.hits,
+            'misses': info.misses,
+            'size': info.currsize,
+            'maxsize': info.maxsize,
+            'hit_rate': info.hits / lookups if lookups else 0.0
+        }
+    return stats
+
+
+configure_label_cache()
+
+
+def clean_item_name(name):
+    """清理项目名称"""
+    if not name:
+        return ""
+    return _label_caches['clean_item_name'](str(name))
+
+
+def standardize_name(name):
+    """标准化项目名称"""
+    return _label_caches['standardize_name'](name)
+
+
+def names_match(name1, name2):
+    """比较两个名称是否匹配"""
+    # 移除所有空格和特殊字符后比较
+    name1 = clean_item_name(name1)
+    name2 = clean_item_name(name2)
+
+    # 直接相等
+    if name1 == name2:
+        return True
+
+    # 忽略"合计"、"小计"等后缀
+    suffixes = ['合计', '小计', '总计', '净额', '净值', '：', ':', '总额']
+    for suffix in suffixes:
+        if name1.endswith(suffix):
+            name1 = name1[:-len(suffix)]
+        if name2.endswith(suffix):
+            name2 = name2[:-len(suffix)]
+
+    # 处理特殊的匹配规则
+    special_matches = {
+        '待摊费用': ['长期待摊费用'],
+        '其它长期资产': ['其他非流动资产'],
+        '所有者权益': ['所有者权益（或股东权益）'],
+        '股东权益': ['所有者权益（或股东权益）'],
+        '流动资产': ['流动资产：', '流动资产合计'],
+        '非流动资产': ['非流动资产：', '非流动资产合计'],
+        '流动负债': ['流动负债：', '流动负债合计'],
+        '非流动负债': ['非流动负债：', '非流动负债合计'],
+        '资产': ['资产总计', '资产合计'],
+        '负债': ['负债合计', '负债总计'],
+        '所有者权益': ['所有者权益（或股东权益）：', '所有者权益（或股东权益）合计']
+    }
+
+    # 检查特殊匹配
+    for key, values in special_matches.items():
+        if name1 == key and name2 in values:
+            return True
+        if name2 == key and name1 in values:
+            return True
+
+    # 如果都不匹配，返回标准比较结果
+    return name1 == name2
+
+
+SYNONYMS = {
+    # 流动资产类
+    '货币资金': ['货币资金', '现金', '银行存款', '库存现金', '银行存款', '货币', '现金及存放中央银行款项'],
+    '交易性金融资产': ['交易性金融资产', '交易性金融资产净额',
+              '以公允价值计量且其变动计入当期损益的金融资产', '交易性投资'],
+    '应收票据': ['应收票据', '应收票据净额', '应收票据及应收账款', '应收票据和应收账款'],
+    '应收账款': ['应收账款', '应收账款净额', '应收款项', '应收票据及应收账款', '应收款'],
+    '预付款项': ['预付款项', '预付账款', '预付款', '预付', '预付款项净额'],
+    '应收利息': ['应收利息', '应收利息净额', '应收利息收入', '应收利息及应收股利'],
+    '应收股利': ['应收股利', '应收股息', '应收股息红利', '应收利息及应收股利'],
+    '其他应收款': ['其他应收款', '其他应收款净额', '其它应收款', '其它应收', '其他应收'],
+    '存货': ['存货', '存货净额', '库存商品', '存货及合同履约成本', '库存'],
+    '一年内到期的非流动资产': ['一年内到期的非流动资产', '一年内到期非流动资产', '一年内到期长期资产'],
+    '其他流动资产': ['其他流动资产', '其它流动资产', '其他流动', '其它流动'],
+
+    # 非流动资产类
+    '可供出售金融资产': ['可供出售金融资产', '可供出售的金融资产', '可供出售投资'],
+    '持有至到期投资': ['持有至到期投资', '持有到期投资', '持有至到期'],
+    '长期应收款': ['长期应收款', '长期应收款项', '长期应收'],
+    '长期股权投资': ['长期股权投资', '长期投资', '长期股权'],
+    '投资性房地产': ['投资性房地产', '投资性房产', '投资房地产'],
+    '固定资产': ['固定资产', '固定资产净额', '固定资产净值', '固定资产原价', '固定资产价值'],
+    '在建工程': ['在建工程', '在建工程净额', '在建项目', '在建'],
+    '工程物资': ['工程物资', '工程材料', '工程用料'],
+    '固定资产清理': ['固定资产清理', '固定资产清算', '资产清理'],
+    '生产性生物资产': ['生产性生物资产', '生物资产', '生产性生物'],
+    '油气资产': ['油气资产', '石油天然气资产', '油气'],
+    '无形资产': ['无形资产', '无形资产净额', '无形资产价值', '无形'],
+    '开发支出': ['开发支出', '研发支出', '开发成本', '研发费用'],
+    '商誉': ['商誉', '商誉净额', '商誉价值'],
+    '长期待摊费用': ['长期待摊费用', '待摊费用', '长期待摊', '待摊'],
+    '递延所得税资产': ['递延所得税资产', '递延税款', '递延所得税', '递延税资产'],
+    '其他非流动资产': ['其他非流动资产', '其它非流动资产', '其他长期资产', '其它长期资产'],
+
+    # 流动负债类
+    '短期借款': ['短期借款', '短期贷款', '短期债务', '短期融资'],
+    '交易性金融负债': ['交易性金融负债', '以公允价值计量且其变动计入当期损益的金融负债', '交易性负债'],
+    '应付票据': ['应付票据', '应付汇票', '应付票据及应付账款'],
+    '应付账款': ['应付账款', '应付账款净额', '应付款项', '应付票据及应付账款'],
+    '预收款项': ['预收款项', '预收账款', '预收款', '合同负债', '预收'],
+    '应付职工薪酬': ['应付职工薪酬', '应付工资', '工资福利', '应付工资薪酬'],
+    '应交税费': ['应交税费', '应交税金', '应缴税金', '应交税款'],
+    '应付利息': ['应付利息', '应付利息费用', '应付利息及应付股利'],
+    '应付股利': ['应付股利', '应付股息', '应付利息及应付股利'],
+    '其他应付款': ['其他应付款', '其他应付款净额', '其它应付款', '其他应付'],
+    '一年内到期的非流动负债': ['一年内到期的非流动负债', '一年内到期非流动负债', '一年内到期长期负债'],
+    '其他流动负债': ['其他流动负债', '其它流动负债', '其他流动', '其它流动'],
+
+    # 非流动负债类
+    '长期借款': ['长期借款', '长期贷款', '长期债务', '长期融资'],
+    '应付债券': ['应付债券', '应付债券净额', '债券'],
+    '长期应付款': ['长期应付款', '长期应付款项', '长期应付'],
+    '专项应付款': ['专项应付款', '专项款项', '专项应付'],
+    '预计负债': ['预计负债', '预计债务', '预提负债'],
+    '递延所得税负债': ['递延所得税负债', '递延税负债', '递延税款负债'],
+    '其他非流动负债': ['其他非流动负债', '其它非流动负债', '其他长期负债'],
+
+    # 所有者权益类
+    '股本': ['股本', '实收资本', '实收资本(或股本)', '注册资本', '股本金'],
+    '资本公积': ['资本公积', '资本公积金', '资本溢价', '股本溢价'],
+    '减：库存股': ['减：库存股', '库存股', '库存股份', '减库存股'],
+    '盈余公积': ['盈余公积', '盈余公积金', '法定盈余', '盈余'],
+    '未分配利润': ['未分配利润', '未分配利润(未弥补亏损)', '累计利润', '留存收益'],
+    '少数股东权益': ['少数股东权益', '少数股东权益合计', '少数股东'],
+
+    # 报表类别和合计项
+    '流动资产': ['流动资产', '流动资产合计', '流动资产总计', '流动资产：', '流动资产总额'],
+    '非流动资产': ['非流动资产', '非流动资产合计', '非流动资产总计', '非流动资产：', '非流动资产总额'],
+    '资产总计': ['资产总计', '资产合计', '资产总额', '资产总额合计'],
+    '流动负债': ['流动负债', '流动负债合计', '流动负债总计', '流动负债：', '流动负债总额'],
+    '非流动负债': ['非流动负债', '非流动负债合计', '非流动负债总计', '非流动负债：', '非流动负债总额'],
+    '负债合计': ['负债合计', '负债总计', '负债总额', '负债总额合计'],
+    '所有者权益': ['所有者权益', '所有者权益（或股东权益）：', '所有者权益（或股东权益）合计',
+            '股东权益', '股东权益合计', '所有者权益（或股东权益）总计', '所有者权益总额'],
+    '负债和所有者权益总计': ['负债和所有者权益总计', '负债和所有者权益（或股东权益）总计',
+                 '负债及所有者权益总计', '负债和股东权益总计', '负债及股东权益总计'],
+
+    # 特殊项目
+    '预提费用': ['预提费用', '预提成本费用', '预提支出'],
+    '未结清对外担保余额': ['未结清对外担保余额', '对外担保余额', '担保余额']
+}
+
+
+def get_synonyms():
+    """获取同义词字典"""
+    return SYNONYMS
+
+
+def normalize_label(name):
+    """按 match_item_name 的规则标准化项目名称，用作匹配索引的键"""
+    if not name:
+        return ""
+    return _label_caches['normalize_label'](str(name))
+
+
+class LabelMatcher:
+    """编译后的项目名称匹配器
+
+    每个模板名称的标准化结果，以及与它同属一个同义词组的所有写法，都作为索引键
+    指向该模板的位置。查询时返回所有能匹配的模板位置（按模板顺序）。
+    """
+
+    def __init__(self, template_names):
+        self.template_names = tuple(template_names)
+
+        # 同义词写法 → 包含该写法的同义词组
+        groups = {}
+        for standard, variants in MATCH_SYNONYMS.items():
+            members = frozenset(variants) | {standard}
+            for member in members:
+                groups.setdefault(member, []).append(members)
+
+        index = {}
+        for position, template_name in enumerate(self.template_names):
+            key = normalize_label(template_name)
+            if not key:
+                continue
+            keys = {key}
+            for members in groups.get(key, ()):
+                keys.update(members)
+            for key in keys:
+                index.setdefault(key, []).append(position)
+        self._index = {key: tuple(positions) for key, positions in index.items()}
+
+    def candidates(self, source_name):
+        """返回能与原表项目匹配的模板名称（按模板顺序）"""
+        if not source_name:
+            return ()
+        positions = self._index.get(normalize_label(source_name), ())
+        return tuple(self.template_names[position] for position in positions)
+
+
+# 模糊匹配的默认置信度阈值（Dice系数）
+FUZZY_THRESHOLD = 0.7
+
+# 模糊匹配时去掉括号内的附注、说明等内容
+_FUZZY_NOTES = re.compile(r'[（(［\[【][^（）()［］\[\]【】]*[）)］\]】]')
+
+# 模糊匹配时开头的"加："、"减："
+_FUZZY_SIGN = re.compile(r'^\s*[加减]\s*[:：]')
+
+# 以"其中"开头的明细项目只与同样是明细的模板项目模糊匹配，
+# 否则"其中：应收账款"这样的明细行会与它所属的项目"应收账款"相似而占用该项目
+_FUZZY_DETAIL_PREFIX = '其中'
+
+# 模糊匹配时忽略的连接符号，并统一常见的异体字
+_FUZZY_TABLE = str.maketrans({'-': None, '_': None, '/': None, '+': None, '·': None, '帐': '账'})
+
+
+def fuzzy_key(name):
+    """模糊匹配使用的标准化名称"""
+    if not name:
+        return ""
+    name = _FUZZY_SIGN.sub('', _FUZZY_NOTES.sub('', str(name)))
+    return normalize_label(name).translate(_FUZZY_TABLE)
+
+
+def char_ngrams(text, sizes=(2, 3)):
+    """返回文本的字符二元组和三元组集合，单个字符时返回该字符"""
+    if len(text) < 2:
+        return {text} if text else set()
+    grams = set()
+    for size in sizes:
+        for start in range(len(text) - size + 1):
+            grams.add(text[start:start + size])
+    return grams
+
+
+class FuzzyIndex:
+    """字符n元组倒排索引，用于精确和同义词匹配都失败的项目
+
+    模板名称及其所有同义词写法都按二元组、三元组建立倒排索引（n元组 → 写法编号），
+    写法按模板顺序连续排列。StatementMatcher 由它构建写法 × n元组矩阵，
+    用Dice系数作为置信度，每个模板取其最佳写法的得分。
+    """
+
+    def __init__(self, template_names):
+        self.template_names = tuple(template_names)
+
+        # 标准化后的同义词组（包括 match_item_name 和 get_synonyms 两组同义词）
+        groups = {}
+        for synonyms in (MATCH_SYNONYMS, SYNONYMS):
+            for standard, variants in synonyms.items():
+                members = frozenset(filter(None, (fuzzy_key(name) for name in [standard] + variants)))
+                for member in members:
+                    groups.setdefault(member, []).append(members)
+
+        # 每个写法记录 (模板位置, n元组数量)
+        self.entries = []
+        self.index = {}
+        for position, template_name in enumerate(self.template_names):
+            key = fuzzy_key(template_name)
+            if not key:
+                continue
+            keys = {key}
+            for members in groups.get(key, ()):
+                keys.update(members)
+            for key in sorted(keys):
+                grams = char_ngrams(key)
+                entry = len(self.entries)
+                self.entries.append((position, len(grams)))
+                for gram in grams:
+                    self.index.setdefault(gram, []).append(entry)
+
+
+# 已保存的对应关系中表示"确认不对应任何模板项目"的值
+NO_MATCH = ''
+
+# 全局分配时各种匹配方式的得分：精确匹配 > 同义词匹配 > 模糊匹配
+# 已保存的对应关系（见 Rmapping）在打分之前直接分配
+LEARNED_SCORE = 1.0
+EXACT_SCORE = 1.0
+SYNONYM_SCORE = 0.99
+FUZZY_WEIGHT = 0.98
+
+
+class LabelAssignment:
+    """一个原表项目到模板项目的分配结果"""
+
+    __slots__ = ('label_index', 'template_name', 'score', 'method')
+
+    def __init__(self, label_index, template_name, score, method):
+        self.label_index = label_index
+        self.template_name = template_name
+        self.score = score
+        # 'learned'、'exact'、'synonym' 或 'fuzzy'
+        self.method = method
+
+
+class StatementMatcher:
+    """对一张报表的所有项目一次性打分并做全局一对一分配
+
+    精确、同义词和模糊匹配的得分合成一个 原表项目 × 模板项目 的相似度矩阵，
+    模糊匹配部分由n元组矩阵相乘得到。分配时按得分从高到低贪心选择，每个原表项目
+    和每个模板项目最多使用一次，得分相同时先出现的原表项目和模板项目优先，
+    因此结果与原表中行的顺序无关且可重复。
+    """
+
+    def __init__(self, template_names):
+        self.template_names = tuple(template_names)
+        self.matcher = LabelMatcher(self.template_names)
+        self.fuzzy_index = FuzzyIndex(self.template_names)
+        self._template_keys = [normalize_label(name) for name in self.template_names]
+        self._detail_templates = np.array([key.startswith(_FUZZY_DETAIL_PREFIX) for key in self._template_keys],
+                                          dtype=bool)
+        self._positions = {name: position for position, name in enumerate(self.template_names)}
+
+        # 模板写法的n元组矩阵（写法 × n元组），写法按模板顺序连续排列
+        self._vocabulary = {gram: column for column, gram in enumerate(self.fuzzy_index.index)}
+        entries = self.fuzzy_index.entries
+        matrix = np.zeros((len(entries), len(self._vocabulary)), dtype=np.float32)
+        for gram, column in self._vocabulary.items():
+            matrix[self.fuzzy_index.index[gram], column] = 1.0
+        self._variant_matrix = matrix.T.copy()
+        self._variant_sizes = np.array([size for _, size in entries], dtype=np.float32)
+        positions = np.array([position for position, _ in entries], dtype=np.int64)
+        # 每个模板第一个写法的位置，用于按模板取最大值
+        self._group_starts = np.flatnonzero(np.r_[True, positions[1:] != positions[:-1]]) \
+            if len(positions) else np.array([], dtype=np.int64)
+        self._group_positions = positions[self._group_starts] if len(positions) else positions
+
+    def score_matrix(self, labels, fuzzy_threshold=FUZZY_THRESHOLD):
+        """返回 (得分矩阵, 匹配方式矩阵)，形状为 原表项目数 × 模板项目数
+
+        匹配方式矩阵中 3 为精确匹配，2 为同义词匹配，1 为模糊匹配，0 为不匹配。
+        """
+        n_labels, n_templates = len(labels), len(self.template_names)
+        scores = np.zeros((n_labels, n_templates), dtype=np.float32)
+        methods = np.zeros((n_labels, n_templates), dtype=np.int8)
+        if not n_labels or not n_templates:
+            return scores, methods
+
+        # 模糊匹配：原表项目的n元组矩阵与模板写法矩阵相乘得到共享n元组数量
+        if fuzzy_threshold is not None and len(self._group_starts):
+            label_matrix = np.zeros((n_labels, len(self._vocabulary)), dtype=np.float32)
+            label_sizes = np.zeros(n_labels, dtype=np.float32)
+            for row, label in enumerate(labels):
+                grams = char_ngrams(fuzzy_key(label))
+                label_sizes[row] = len(grams)
+                columns = [self._vocabulary[gram] for gram in grams if gram in self._vocabulary]
+                label_matrix[row, columns] = 1.0
+            shared = label_matrix @ self._variant_matrix
+            with np.errstate(divide='ignore', invalid='ignore'):
+                dice = np.where(shared > 0,
+                                2.0 * shared / (label_sizes[:, None] + self._variant_sizes[None, :]),
+                                0.0)
+            best = np.maximum.reduceat(dice, self._group_starts, axis=1)
+            best = np.where(best >= fuzzy_threshold, best * FUZZY_WEIGHT, 0.0)
+            details = np.array([normalize_label(label).startswith(_FUZZY_DETAIL_PREFIX) for label in labels],
+                               dtype=bool)
+            if details.any():
+                best[np.ix_(details, ~self._detail_templates[self._group_positions])] = 0.0
+            scores[:, self._group_positions] = best
+            methods[:, self._group_positions] = np.where(best > 0, 1, 0)
+
+        # 精确和同义词匹配：通过哈希索引查找
+        for row, label in enumerate(labels):
+            key = normalize_label(label)
+            for template_name in self.matcher.candidates(label):
+                position = self._positions[template_name]
+                if key == self._template_keys[position]:
+                    scores[row, position] = EXACT_SCORE
+                    methods[row, position] = 3
+                else:
+                    scores[row, position] = SYNONYM_SCORE
+                    methods[row, position] = 2
+        return scores, methods
+
+    def assign(self, labels, fuzzy_threshold=FUZZY_THRESHOLD, known=None):
+        """为原表项目做一对一分配，返回按原表顺序排列的 LabelAssignment 列表
+
+        known 为已确认的 {原表项目: 模板项目}，命中的项目直接分配，不再标准化和打分，
+        对应 NO_MATCH 的项目直接跳过，只有剩下的项目参与全局分配。
+        """
+        assignments = []
+        used_templates = set()
+        remaining = range(len(labels))
+        if known:
+            remaining = []
+            for index, label in enumerate(labels):
+                template_name = known.get(label)
+                if template_name == NO_MATCH:
+                    continue
+                position = self._positions.get(template_name)
+                if position is not None and position not in used_templates:
+                    used_templates.add(position)
+                    assignments.append(LabelAssignment(
+                        index, self.template_names[position], LEARNED_SCORE, 'learned'))
+                else:
+                    remaining.append(index)
+            if not remaining:
+                return assignments
+
+        scores, methods = self.score_matrix([labels[index] for index in remaining], fuzzy_threshold)
+        if used_templates:
+            scores[:, sorted(used_templates)] = 0
+        rows, cols = np.nonzero(scores)
+        if not len(rows):
+            return assignments
+        # 按得分从高到低，得分相同时按原表顺序、模板顺序
+        order = np.lexsort((cols, rows, -scores[rows, cols]))
+
+        method_names = {3: 'exact', 2: 'synonym', 1: 'fuzzy'}
+        used_labels = set()
+        for index in order:
+            row, col = int(rows[index]), int(cols[index])
+            if row in used_labels or col in used_templates:
+                continue
+            used_labels.add(row)
+            used_templates.add(col)
+            assignments.append(LabelAssignment(
+                remaining[row], self.template_names[col], float(scores[row, col]),
+                method_names[int(methods[row, col])]))
+        assignments.sort(key=lambda assignment: assignment.label_index)
+        return assignments
+
+
+@lru_cache(maxsize=None)
+def compile_statement_matcher(template_names):
+    """为一组模板名称编译全局分配匹配器（相同的模板只编译一次）"""
+    return StatementMatcher(template_names)
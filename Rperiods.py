@@ -0,0 +1,253 @@
+"""期间列识别
+
+一次读取sheet前几行的表头区域，解析其中的期间短语（期末余额、年初余额、本年累计、
+上年同期等）和日期（2024-12-31、2024年12月31日、2024年度等），为每一列计算它作为
+本期、上期、年初的得分，再为三个期间各分配一列，并给出整体的置信度。
+置信度高的文件可以直接使用自动分配的结果，不需要人工选择。
+"""
+import datetime
+import re
+
+from openpyxl.utils import get_column_letter
+
+from Rtotals import PERIODS
+
+# 表头区域的行数和最多检查的列数
+HEADER_ROWS = 7
+MAX_COLUMNS = 100
+
+# 检查列下方是否有数值时读取的行数
+SAMPLE_ROWS = 200
+
+# 自动分配的默认置信度阈值，低于该值的文件需要人工确认期间列
+AUTO_CONFIDENCE = 0.75
+
+# 期间短语：(正则, 期间, 得分)，同一单元格取各期间的最高得分
+PERIOD_PHRASES = [
+    (r'期末(?:余额|数|金额)', '本期', 0.95),
+    (r'本期(?:金额|发生额|数|累计)', '本期', 0.95),
+    (r'本年(?:累计|金额|数|发生额)', '本期', 0.95),
+    (r'本月(?:金额|数)', '本期', 0.7),
+    (r'期末|本期|本年', '本期', 0.8),
+    (r'本月', '本期', 0.6),
+    (r'上年同期|上期(?:金额|发生额|数|累计)|上年(?:累计|金额|数|发生额)', '上期', 0.95),
+    (r'上期|上年(?!年?末)', '上期', 0.8),
+    (r'同期', '上期', 0.7),
+    (r'(?:年初|期初)(?:余额|数|金额)|上年年?末(?:余额|数|金额)?', '年初', 0.95),
+    (r'年初|期初', '年初', 0.8),
+]
+_PHRASES = [(re.compile(pattern), period, score) for pattern, period, score in PERIOD_PHRASES]
+
+# 不是期间列的表头
+_EXCLUDED = re.compile(r'行次|项目|附注|序号|栏次')
+
+# 日期：2024-12-31、2024/12/31、2024.12.31、2024年12月31日、2024年12月、2024年度、2024年1-12月
+_DATE = re.compile(
+    r'(?P<year>(?:19|20)\d{2})\s*(?:[-/.]\s*(?P<month>\d{1,2})(?:\s*[-/.]\s*(?P<day>\d{1,2}))?'
+    r'|年\s*(?:(?:\d{1,2}\s*[-—~至]\s*)?(?P<month2>\d{1,2})\s*月(?:\s*(?P<day2>\d{1,2})\s*日)?|度)?)'
+)
+
+# 日期推断的得分
+DATE_LATEST_SCORE = 0.85
+DATE_MATCHED_SCORE = 0.85
+DATE_OTHER_SCORE = 0.6
+
+# 列下方没有数值时得分的折扣
+NO_DATA_FACTOR = 0.5
+
+# 同一期间有表头不同、得分接近的其它列时置信度的折扣
+AMBIGUITY_MARGIN = 0.05
+AMBIGUITY_FACTOR = 0.6
+
+
+class PeriodDetection:
+    """一张sheet的期间列识别结果
+
+    columns 为 {列字母: 表头文字}（所有候选列，按列顺序），selection 为
+    {期间: 列字母或None}，scores 为所选列的得分，confidence 为整体置信度（0-1）。
+    """
+
+    def __init__(self, columns, selection, scores, confidence):
+        self.columns = columns
+        self.selection = selection
+        self.scores = scores
+        self.confidence = confidence
+
+    def describe(self):
+        """所选列的说明文字"""
+        parts = []
+        for period in PERIODS:
+            col = self.selection[period]
+            parts.append(f"{period}={col}（{self.columns[col]}）" if col else f"{period}=无")
+        return "，".join(parts)
+
+
+def parse_header_date(value):
+    """解析表头中的日期，返回 (日期, 是否为时点)，不是日期时返回None
+
+    时点为具体的某一天（如 2024-12-31），否则为期间（如 2024年度、2024年1-6月），
+    期间用其最后一天表示。
+    """
+    if isinstance(value, datetime.datetime):
+        return value.date(), True
+    if isinstance(value, datetime.date):
+        return value, True
+    if not isinstance(value, str):
+        return None
+    match = _DATE.search(value)
+    if not match:
+        return None
+    year = int(match.group('year'))
+    month = match.group('month') or match.group('month2')
+    day = match.group('day') or match.group('day2')
+    try:
+        if day:
+            return datetime.date(year, int(month), int(day)), True
+        month = int(month) if month else 12
+        # 期间的最后一天
+        following = datetime.date(year + month // 12, month % 12 + 1, 1)
+        return following - datetime.timedelta(days=1), False
+    except ValueError:
+        return None
+
+
+def phrase_scores(text):
+    """表头文字中的期间短语得分 {期间: 得分}"""
+    scores = {}
+    if _EXCLUDED.search(text):
+        return scores
+    for pattern, period, score in _PHRASES:
+        if score > scores.get(period, 0) and pattern.search(text):
+            scores[period] = score
+    return scores
+
+
+def _has_numbers(rows, col):
+    """列中是否有数值（包括带千分位的数字文本）"""
+    for values in rows:
+        if col <= len(values):
+            value = values[col - 1]
+            if isinstance(value, bool):
+                continue
+            if isinstance(value, (int, float)):
+                return True
+            if isinstance(value, str):
+                try:
+                    float(value.replace(',', ''))
+                    return True
+                except ValueError:
+                    continue
+    return False
+
+
+def detect_period_columns(sheet, sheet_type=None):
+    """识别sheet中的期间列并自动分配本期、上期、年初
+
+    sheet_type 为 'balance_sheet' 时，较早的年末日期按年初处理，其它报表按上期处理；
+    预处理时排除的列不作为候选列。
+    """
+    header = sheet.rows[:HEADER_ROWS]
+    max_cols = min(sheet.max_column, MAX_COLUMNS)
+
+    # 每列的表头文字、短语得分、日期和表头所在的最后一行
+    texts = {}
+    scores = {}
+    dates = {}
+    header_end = {}
+    for row, values in enumerate(header, start=1):
+        for col in range(1, min(len(values), max_cols) + 1):
+            value = values[col - 1]
+            if value is None or col in sheet.excluded_columns:
+                continue
+            if isinstance(value, (datetime.date, datetime.datetime)):
+                text = f"{value:%Y-%m-%d}"
+            else:
+                text = str(value).strip()
+            cell_scores = phrase_scores(text) if isinstance(value, str) else {}
+            date = None if _EXCLUDED.search(text) else parse_header_date(value)
+            if not cell_scores and not date:
+                continue
+            texts.setdefault(col, []).append(text)
+            header_end[col] = row
+            column_scores = scores.setdefault(col, {})
+            for period, score in cell_scores.items():
+                column_scores[period] = max(column_scores.get(period, 0), score)
+            if date and col not in dates:
+                dates[col] = date
+
+    _score_dates(scores, dates, sheet_type)
+
+    # 表头下方没有任何数值的候选列降低得分
+    for col, column_scores in scores.items():
+        sample = sheet.rows[header_end[col]:header_end[col] + SAMPLE_ROWS]
+        if not _has_numbers(sample, col):
+            for period in column_scores:
+                column_scores[period] *= NO_DATA_FACTOR
+
+    columns = {get_column_letter(col): " ".join(texts[col]) for col in sorted(texts)}
+    selection, selected_scores, confidence = _assign(scores, columns)
+    return PeriodDetection(columns, selection, selected_scores, confidence)
+
+
+def _score_dates(scores, dates, sheet_type):
+    """根据各列日期的先后推断期间：最晚的为本期，较早的为上期或年初"""
+    if not dates:
+        return
+    latest, _ = max(dates.values())
+    for col, (date, is_point) in dates.items():
+        column_scores = scores.setdefault(col, {})
+        if date == latest:
+            score = DATE_LATEST_SCORE if len(set(dates.values())) > 1 else DATE_OTHER_SCORE
+            column_scores['本期'] = max(column_scores.get('本期', 0), score)
+            continue
+        previous_year_end = datetime.date(latest.year - 1, 12, 31)
+        same_day_last_year = _same_day_last_year(latest)
+        if sheet_type == 'balance_sheet' and is_point:
+            period = '年初'
+            score = DATE_MATCHED_SCORE if date == previous_year_end else DATE_OTHER_SCORE
+        else:
+            period = '上期'
+            score = DATE_MATCHED_SCORE if date == same_day_last_year else DATE_OTHER_SCORE
+        column_scores[period] = max(column_scores.get(period, 0), score)
+
+
+def _same_day_last_year(date):
+    try:
+        return date.replace(year=date.year - 1)
+    except ValueError:
+        # 2月29日
+        return date.replace(year=date.year - 1, day=28)
+
+
+def _assign(scores, columns):
+    """按得分从高到低为每个期间分配一列，每列只分配一次，得分相同时靠左的列优先"""
+    candidates = sorted(
+        ((score, col, period) for col, column_scores in scores.items()
+         for period, score in column_scores.items() if score > 0),
+        key=lambda candidate: (-candidate[0], candidate[1], PERIODS.index(candidate[2])))
+    selection = dict.fromkeys(PERIODS)
+    selected_scores = {}
+    used = set()
+    for score, col, period in candidates:
+        if selection[period] is None and col not in used:
+            selection[period] = get_column_letter(col)
+            selected_scores[period] = score
+            used.add(col)
+
+    if selection['本期'] is None:
+        return selection, selected_scores, 0.0
+
+    # 同一期间有表头不同、得分接近的未选列时无法确定，降低置信度
+    # （左右两侧表头相同的列不算，如资产负债表两侧的"期末余额"）
+    confidence = 1.0
+    for period, score in selected_scores.items():
+        chosen = columns[selection[period]]
+        period_confidence = score
+        for other_score, col, other_period in candidates:
+            if (other_period == period and get_column_letter(col) not in selection.values()
+                    and other_score >= score - AMBIGUITY_MARGIN
+                    and columns[get_column_letter(col)] != chosen):
+                period_confidence *= AMBIGUITY_FACTOR
+                break
+        confidence = min(confidence, period_confidence)
+    return selection, selected_scores, round(confidence, 2)
@@ -0,0 +1,1042 @@
+"""报表转换流水线
+
+不依赖 tkinter 的转换核心：加载 → 分析期间 → 预处理 → 提取 → 合计 → 指标 → 导出。
+流水线对象本身只保存日志和进度回调，每次转换的数据都保存在独立的
+WorkbookDocument / ConversionResult 中，因此可以在多个线程或进程中并发使用。
+"""
+import os
+import re
+import datetime
+from zipfile import ZipFile, ZIP_DEFLATED, ZIP_STORED
+import numpy as np
+import pandas as pd
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+from openpyxl.writer.excel import ExcelWriter
+from Rloader import open_document
+from Rmatcher import compile_statement_matcher, label_cache_stats, FUZZY_THRESHOLD, NO_MATCH
+from Rtotals import PERIODS, compile_totals
+from Rprogress import ProgressReporter
+from Rlogging import level_number
+from Rexport import long_rows, open_long_writer
+from Rcache import CachedDocument
+from Rperiods import detect_period_columns
+from Rlayout import ColumnPlan, analyze_balance_layout, column_numbers
+from Rprofile import ConversionProfile, NULL_PROFILE, profile_path
+from Rstatement import Statement
+
+# 三张报表的类型标识
+SHEET_TYPES = ('balance_sheet', 'cash_flow', 'income_statement')
+
+# 导出时使用的工作表名称
+SHEET_TITLES = {
+    'balance_sheet': '资产负债表',
+    'cash_flow': '现金流量表',
+    'income_statement': '损益表'
+}
+
+# 导出文件的ZIP压缩方式：名称 → (压缩算法, 压缩级别)
+# standard 与 openpyxl 默认相同；fast 压缩更快、文件稍大，适合大批量转换；store 不压缩
+COMPRESSION_PROFILES = {
+    'standard': (ZIP_DEFLATED, None),
+    'fast': (ZIP_DEFLATED, 1),
+    'store': (ZIP_STORED, None)
+}
+
+# 预处理时排除的辅助列（TB、Trial Balance等）：表头中包含这些文字的列
+EXCLUDED_COLUMN_PATTERN = re.compile(r'tb|trial balance|global', re.IGNORECASE)
+
+# 预处理检查的表头行数和最多检查的列数（从最后一列向前）
+PREPROCESS_HEADER_ROWS = 20
+PREPROCESS_MAX_COLUMNS = 100
+
+# 自动识别sheet时使用的名称关键字
+SHEET_KEYWORDS = {
+    'balance_sheet': ['资产负债'],
+    'cash_flow': ['现金流量'],
+    'income_statement': ['利润', '损益']
+}
+
+# 无人值守转换（如批量转换）时保存为客户对应关系的匹配方式，
+# 模糊匹配和未匹配的项目需要人工确认后才保存
+AUTO_CONFIRM_METHODS = ('exact', 'synonym')
+
+
+def check_time_lock():
+    """检查时间锁"""
+    try:
+        current_date = datetime.datetime.now().date()
+        start_date = datetime.date(2025, 2, 5)
+        end_date = datetime.date(2025, 6, 1)
+
+        return start_date <= current_date <= end_date
+    except:
+        return False
+
+
+def get_balance_sheet_template():
+    """获取资产负债表模板"""
+    template = [
+        ('流动资产：', 1),
+        ('    货币资金', 2),
+        ('    交易性金融资产', 3),
+        ('    应收票据', 4),
+        ('    应收账款', 5),
+        ('    预付款项', 6),
+        ('    应收利息', 7),
+        ('    应收股利', 8),
+        ('    其他应收款', 9),
+        ('    存货', 10),
+        ('    一年内到期的非流动资产', 11),
+        ('    其他流动资产', 12),
+        ('    待摊费用', 13),
+        ('流动资产合计', 14),
+        ('非流动资产：', 15),
+        ('    可供出售金融资产', 16),
+        ('    持有至到期投资', 17),
+        ('    长期应收款', 18),
+        ('    长期股权投资', 19),
+        ('    投资性房地产', 20),
+        ('    固定资产', 21),
+        ('    在建工程', 22),
+        ('    工程物资', 23),
+        ('    固定资产清理', 24),
+        ('    生产性生物资产', 25),
+        ('    油气资产', 26),
+        ('    无形资产', 27),
+        ('    开发支出', 28),
+        ('    商誉', 29),
+        ('    长期待摊费用', 30),
+        ('    递延所得税资产', 31),
+        ('    其他非流动资产', 32),
+        ('    其它长期资产', 33),
+        ('非流动资产合计', 34),
+        ('资产总计', 35),
+        ('流动负债：', 36),
+        ('    短期借款', 37),
+        ('    交易性金融负债', 38),
+        ('    应付票据', 39),
+        ('    应付账款', 40),
+        ('    预收款项', 41),
+        ('    应付职工薪酬', 42),
+        ('    应交税费', 43),
+        ('    应付利息', 44),
+        ('    应付股利', 45),
+        ('    其他应付款', 46),
+        ('    预提费用', 47),
+        ('    一年内到期的非流动负债', 48),
+        ('    其他流动负债', 49),
+        ('流动负债合计', 50),
+        ('非流动负债：', 51),
+        ('    长期借款', 52),
+        ('    应付债券', 53),
+        ('    长期应付款', 54),
+        ('    专项应付款', 55),
+        ('    预计负债', 56),
+        ('    递延所得税负债', 57),
+        ('    其他非流动负债', 58),
+        ('非流动负债合计', 59),
+        ('负债合计', 60),
+        ('所有者权益（或股东权益）：', 61),
+        ('    股本', 62),
+        ('    资本公积', 63),
+        ('    减：库存股', 64),
+        ('    盈余公积', 65),
+        ('    未分配利润', 66),
+        ('    少数股东权益', 67),
+        ('    未结清对外担保余额', 68),
+        ('所有者权益（或股东权益）合计', 69),
+        ('负债和所有者权益（或股东权益）总计', 70)
+    ]
+    return Statement.from_items('balance_sheet', template)
+
+def get_cash_flow_template():
+    """获取现金流量表模板"""
+    template = [
+        ('一、经营活动产生的现金流量:', 1),
+        ('    销售商品、提供劳务收到的现金', 2),
+        ('    收到的税费返还', 3),
+        ('    收到其他与经营活动有关的现金', 4),
+        ('    经营活动现金流入小计', 5),
+        ('    购买商品、接受劳务支付的现金', 6),
+        ('    支付给职工以及为职工支付的现金', 7),
+        ('    支付的各项税费', 8),
+        ('    支付其他与经营活动有关的现金', 9),
+        ('    经营活动现金流出小计', 10),
+        ('    经营活动产生的现金流量净额', 11),
+        ('二、投资活动产生的现金流量:', 12),
+        ('    收回投资收到的现金', 13),
+        ('    取得投资收益收到的现金', 14),
+        ('    处置固定资产、无形资产和其他长期资产收回的现金净额', 15),
+        ('    处置子公司及其他营业单位收到的现金净额', 16),
+        ('    收到其他与投资活动有关的现金', 17),
+        ('    投资活动现金流入小计', 18),
+        ('    购建固定资产、无形资产和其他长期资产支付的现金', 19),
+        ('    投资支付的现金', 20),
+        ('    取得子公司及其他营业单位支付的现金净额', 21),
+        ('    支付其他与投资活动有关的现金', 22),
+        ('    投资活动现金流出小计', 23),
+        ('    投资活动产生的现金流量净额', 24),
+        ('三、筹资活动产生的现金流量:', 25),
+        ('    吸收投资收到的现金', 26),
+        ('    取得借款收到的现金', 27),
+        ('    收到其他与筹资活动有关的现金', 28),
+        ('    筹资活动现金流入小计', 29),
+        ('    偿还债务支付的现金', 30),
+        ('    分配股利、利润或偿付利息支付的现金', 31),
+        ('    支付其他与筹资活动有关的现金', 32),
+        ('    筹资活动现金流出小计', 33),
+        ('    筹资活动产生的现金流量净额', 34),
+        ('四、汇率变动对现金及现金等价物的影响', 35),
+        ('五、现金及现金等价物增加额', 36)
+    ]
+    return Statement.from_items('cash_flow', template)
+
+def get_income_statement_template():
+    """获取损益表模板"""
+    template = [
+        ('一、营业总收入', 1),
+        ('    减：营业成本', 2),
+        ('    营业税金及附加', 3),
+        ('    销售费用', 4),
+        ('    管理费用', 5),
+        ('    财务费用（收益以"－"号填列）', 6),
+        ('    资产减值损失', 7),
+        ('    加：公允价值变动净收益（净损失以"－"号填列）', 8),
+        ('    投资收益（净损失以"－"号填列）', 9),
+        ('    其中：对联营企业和合营企业的投资收益', 10),
+        ('二、营业利润（亏损以"－"填列）', 11),
+        ('    加：营业外收入', 12),
+        ('    减：营业外支出', 13),
+        ('    其中：非流动资产处置净损失（净收益以"-"号填列）', 14),
+        ('三、利润总额（亏损总额以"－"填列）', 15),
+        ('    减：所得税费用', 16),
+        ('四、净利润（净亏损以"－"号填列）', 17),
+        ('五、每股收益', 18),
+        ('    （一）基本每股收益', 19),
+        ('    （二）稀释每股收益', 20)
+    ]
+    return Statement.from_items('income_statement', template)
+
+
+def get_templates():
+    """获取三张报表的空白模板（每次调用都返回新的 Statement，项目登记表共用）"""
+    return {
+        'balance_sheet': get_balance_sheet_template(),
+        'cash_flow': get_cash_flow_template(),
+        'income_statement': get_income_statement_template()
+    }
+
+
+def guess_sheets(sheet_names):
+    """根据sheet名称识别三张报表"""
+    sheets = {}
+    for sheet_type in SHEET_TYPES:
+        for sheet_name in sheet_names:
+            if any(keyword in sheet_name for keyword in SHEET_KEYWORDS[sheet_type]):
+                sheets[sheet_type] = sheet_name
+                break
+        else:
+            raise ValueError(f"未找到{SHEET_TITLES[sheet_type]}对应的sheet")
+    return sheets
+
+
+def to_numbers(frame):
+    """将DataFrame按列批量转换为数值数组，无法转换的单元格记为0
+
+    先整列直接转换，只有转换失败的文本（如带千分位逗号的数字）才去掉逗号后再转换一次。
+    """
+    numbers = frame.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float, copy=True)
+    failed = np.isnan(numbers) & frame.notna().to_numpy()
+    if failed.any():
+        text = pd.Series(frame.to_numpy()[failed]).astype(str).str.replace(',', '', regex=False)
+        numbers[failed] = pd.to_numeric(text, errors='coerce').to_numpy(dtype=float)
+    return np.where(np.isnan(numbers), 0.0, numbers)
+
+
+class ConversionResult:
+    """一次转换的结果"""
+
+    def __init__(self, file_path, sheets, periods, processed_data, indicators, output_path=None,
+                 profile=NULL_PROFILE):
+        self.file_path = file_path
+        self.sheets = sheets
+        self.periods = periods
+        self.processed_data = processed_data
+        self.indicators = indicators
+        self.output_path = output_path
+        # 各阶段用时和计数（Rprofile），未启用性能记录时为 NULL_PROFILE
+        self.profile = profile
+
+
+class ConversionPipeline:
+    """无界面的报表转换流水线
+
+    sheets 为 {'balance_sheet': sheet名, 'cash_flow': sheet名, 'income_statement': sheet名}，
+    selection 为 {sheet类型: {'本期': 列字母, '上期': 列字母, '年初': 列字母}}，
+    未选择的期间用 None 表示。
+    """
+
+    def __init__(self, log=None, progress=None, fuzzy_threshold=FUZZY_THRESHOLD, log_level='DEBUG',
+                 compression='standard', cache=None, mappings=None, min_confidence=None, profile=False):
+        # log(message, level) 与 progress(percent, eta) 均为可选回调，
+        # 每次提取时为 progress 建立新的 ProgressReporter
+        self.log = log
+        # 低于该级别的日志不会生成（循环中的逐条日志在生成前先检查级别）
+        self.log_level = log_level
+        self.progress = progress
+        # 模糊匹配的置信度阈值，为None时不进行模糊匹配
+        self.fuzzy_threshold = fuzzy_threshold
+        # 导出文件的压缩方式，见 COMPRESSION_PROFILES
+        self.compression = compression
+        # 解析缓存（Rcache.ParseCache），为None时每次都解析原文件
+        self.cache = cache
+        # 客户项目对应关系（Rmapping.MappingStore），为None时只按名称匹配
+        self.mappings = mappings
+        # 自动选择期间列时要求的最低置信度，为None时总是使用自动选择的结果
+        self.min_confidence = min_confidence
+        # 为True时每次转换记录各阶段用时和计数，导出时保存在导出文件旁边
+        self.profile = profile
+
+    def log_enabled(self, level):
+        """该级别的日志是否需要记录"""
+        return self.log is not None and level_number(level) >= level_number(self.log_level)
+
+    def log_message(self, message, level="INFO"):
+        """记录日志信息"""
+        if self.log_enabled(level):
+            self.log(message, level)
+
+    def run(self, file_path, sheets=None, selection=None, save_path=None, customer=None,
+            confirm_mappings=False):
+        """执行完整的转换流程
+
+        sheets 或 selection 为 None 时按名称和表头关键字自动识别，用于无人值守的批量转换。
+        指定 customer 时先使用该客户已保存的项目对应关系，confirm_mappings 为 True 时
+        把本次的精确和同义词匹配结果保存为该客户确认的对应关系（无人审核的模糊匹配
+        和未匹配的项目不保存）。
+        """
+        document = self.load(file_path)
+        try:
+            if sheets is None:
+                sheets = guess_sheets(document.sheet_names)
+            # 先排除辅助列，期间列识别会跳过被排除的列
+            self.preprocess(document, sheets)
+            periods = self.detect_periods(document, sheets)
+            if selection is None:
+                selection = self.auto_selection(periods)
+            processed_data = self.extract(document, sheets, selection, customer)
+            if confirm_mappings:
+                self.confirm_mappings(customer, document, AUTO_CONFIRM_METHODS)
+        finally:
+            document.close()
+        with document.profile.stage('indicators'):
+            indicators = self.calculate_financial_indicators(
+                processed_data['balance_sheet'],
+                processed_data['income_statement'],
+                processed_data['cash_flow']
+            )
+        if save_path:
+            self.export(processed_data, save_path, indicators, document.profile)
+        return ConversionResult(file_path, sheets, periods, processed_data, indicators, save_path,
+                                document.profile)
+
+    def load(self, file_path):
+        """加载Excel文件
+
+        .xlsx 以只读模式打开，.xls 由 xlrd 按需加载；sheet数据都在使用时才读取。
+        启用缓存时，内容相同的文件直接使用缓存中的sheet数据和期间列。
+        启用性能记录时，本次转换的记录保存在 document.profile 中。
+        """
+        profile = ConversionProfile(file_path) if self.profile else NULL_PROFILE
+        with profile.stage('load'):
+            if self.cache is not None:
+                document = CachedDocument(file_path, self.cache)
+            else:
+                document = open_document(file_path)
+        document.profile = profile
+        if self.cache is not None:
+            profile.count('cache_hits' if document.from_cache else 'cache_misses')
+            if document.from_cache:
+                self.log_message(f"文件内容未变化，使用缓存数据：{os.path.basename(file_path)}", "INFO")
+
+        self.log_message(f"导入文件：{os.path.basename(file_path)}", "SUCCESS")
+        return document
+
+    def find_period_columns(self, sheet, sheet_type=None):
+        """识别期间列，返回 Rperiods.PeriodDetection"""
+        detection = detect_period_columns(sheet, sheet_type)
+        if self.log_enabled("DEBUG"):
+            for col_letter, header in detection.columns.items():
+                self.log_message(f"找到期间列: {col_letter} - {header}", "DEBUG")
+
+        # 如果找不到期间列，记录警告
+        if not detection.columns:
+            self.log_message(f"警告：在工作表 {sheet.title} 中未找到任何期间列", "WARNING")
+
+        return detection
+
+    def detect_periods(self, document, sheets):
+        """分析所选sheet中的期间列，返回 {sheet类型: PeriodDetection}
+
+        每个sheet只识别一次，结果保存在文档中。
+        """
+        periods = {}
+        for sheet_type, sheet_name in sheets.items():
+            key = (sheet_type, sheet_name)
+            if key in document.period_detections:
+                document.profile.count('period_detections_cached')
+            else:
+                sheet = document.sheet(sheet_name)
+                with document.profile.stage('detect_periods'):
+                    document.period_detections[key] = self.find_period_columns(sheet, sheet_type)
+            detection = document.period_detections[key]
+            self.log_message(
+                f"自动识别 {sheet_name} 的期间列：{detection.describe()}（置信度 {detection.confidence:.2f}）",
+                "INFO")
+            periods[sheet_type] = detection
+        return periods
+
+    def auto_selection(self, periods):
+        """使用自动分配的期间列，置信度低于 min_confidence 时抛出 ValueError"""
+        if self.min_confidence is not None:
+            for sheet_type, detection in periods.items():
+                if detection.confidence < self.min_confidence:
+                    raise ValueError(
+                        f"{SHEET_TITLES[sheet_type]}的期间列识别置信度 {detection.confidence:.2f} "
+                        f"低于 {self.min_confidence:.2f}，需要人工确认")
+        return {sheet_type: dict(detection.selection) for sheet_type, detection in periods.items()}
+
+    def preprocess(self, document, sheets):
+        """预处理所选的sheet"""
+        for sheet_name in sheets.values():
+            sheet = document.sheet(sheet_name)
+            with document.profile.stage('preprocess'):
+                self.preprocess_sheet(sheet, sheet_name)
+
+    def preprocess_sheet(self, sheet, sheet_name):
+        """预处理工作表，排除包含'TB.global.'的列
+
+        不移动任何单元格，只在值网格上记录被排除的列，期间列识别和数据提取都跳过这些列，
+        因此值网格与原文件（包括公式版本）的坐标始终一致。
+        """
+        self.log_message(f"开始预处理工作表 {sheet_name}...", "INFO")
+
+        # 检查前20行、最后100列（第一列为项目名称，不排除），每列的表头文字合并后用一次正则判断
+        first_col = max(2, sheet.max_column - PREPROCESS_MAX_COLUMNS + 1)
+        header = sheet.rows[:PREPROCESS_HEADER_ROWS]
+        excluded = []
+        for col in range(first_col, sheet.max_column + 1):
+            text = "\n".join(str(values[col - 1]) for values in header
+                              if col <= len(values) and values[col - 1] is not None)
+            if text and EXCLUDED_COLUMN_PATTERN.search(text):
+                excluded.append(col)
+                if self.log_enabled("DEBUG"):
+                    self.log_message(
+                        f"在工作表 {sheet_name} 的 {get_column_letter(col)} 列表头中找到匹配项", "DEBUG")
+        sheet.excluded_columns = frozenset(excluded)
+
+        if excluded:
+            self.log_message(
+                f"在工作表 {sheet_name} 中排除了 {len(excluded)} 列："
+                f"{'、'.join(get_column_letter(col) for col in excluded[:20])}"
+                f"{' 等' if len(excluded) > 20 else ''}", "INFO")
+        else:
+            self.log_message(f"工作表 {sheet_name} 中没有找到需要排除的列", "INFO")
+
+    def extract(self, document, sheets, selection, customer=None):
+        """按照所选期间列提取三张报表的数据
+
+        各报表的 原表项目 → 模板项目 匹配结果保存在 document.label_matches 中，
+        各原表项目的匹配方式保存在 document.match_methods 中。
+        """
+        templates = get_templates()
+        grids = {sheet_type: document.sheet(sheet_name) for sheet_type, sheet_name in sheets.items()}
+        processed_data = {}
+        # 进度报告器只属于这一次提取，同一个流水线可以同时在多个线程中使用
+        progress = ProgressReporter(self.progress)
+        progress.begin()
+        # 项目名称缓存是进程内共享的，记录本次提取前后命中次数的差值
+        label_cache = label_cache_stats() if document.profile.enabled else None
+
+        with document.profile.stage('extract'):
+            # 三张报表各占总进度的三分之一
+            progress.section(0, 100 / 3)
+            processed_data['balance_sheet'] = self.process_balance_sheet(
+                document, grids['balance_sheet'],
+                selection['balance_sheet'], templates['balance_sheet'], customer, progress)
+            progress.section(100 / 3, 200 / 3)
+            processed_data['cash_flow'] = self.process_statement(
+                document, grids['cash_flow'],
+                selection['cash_flow'], templates['cash_flow'], 'cash_flow', customer, progress)
+            progress.section(200 / 3, 100)
+            processed_data['income_statement'] = self.process_statement(
+                document, grids['income_statement'],
+                selection['income_statement'], templates['income_statement'], 'income_statement', customer,
+                progress)
+
+        if label_cache is not None:
+            for name, stats in label_cache_stats().items():
+                document.profile.count('label_cache_hits', stats['hits'] - label_cache[name]['hits'])
+                document.profile.count('label_cache_misses', stats['misses'] - label_cache[name]['misses'])
+        progress.finish()
+        return processed_data
+
+    def process_balance_sheet(self, document, sheet, columns, template, customer=None, progress=None):
+        """处理资产负债表数据
+
+        左右两侧的项目列和期间列在开始时分析一次，得到整数列号的提取计划。
+        """
+        with document.profile.stage('extract.layout'):
+            plan = analyze_balance_layout(sheet, column_numbers(columns))
+        self.log_message(f"资产负债表布局：{plan.describe()}", "INFO")
+        return self.process_plan(document, sheet, plan, template, 'balance_sheet', customer, progress)
+
+    def process_statement(self, document, sheet, columns, template, sheet_type, customer=None, progress=None):
+        """处理现金流量表或损益表数据"""
+        plan = ColumnPlan([(1, column_numbers(columns))])
+        return self.process_plan(document, sheet, plan, template, sheet_type, customer, progress)
+
+    def process_plan(self, document, sheet, plan, template, sheet_type, customer=None, progress=None):
+        """按提取计划收集项目、分配到模板并计算合计项
+
+        progress 为本次提取的 ProgressReporter（按时间节流，可以逐行更新），为None时不报告进度。
+        """
+        if progress is None:
+            progress = ProgressReporter()
+        # 公式索引只在需要时扫描计划中的数值列
+        formulas = document.formula_index(sheet.title, plan.value_columns)
+
+        profile = document.profile
+
+        # 收集所有项目：(项目名称, 行号, {期间: 列号})，每行先左侧后右侧
+        items = []
+        with profile.stage('extract.collect'):
+            for row, values in enumerate(sheet.rows, start=1):
+                progress.update((row / sheet.max_row) * 50)
+                for label_col, columns in plan.sides:
+                    if label_col <= len(values) and values[label_col - 1] is not None:
+                        item_name = str(values[label_col - 1]).strip()
+                        if item_name:
+                            items.append((item_name, row, columns))
+        profile.count('rows_scanned', sheet.max_row)
+
+        document.label_matches[sheet_type], document.match_methods[sheet_type] = self.assign_items(
+            sheet, formulas, template, items, sheet_type, customer, profile, progress)
+        with profile.stage('extract.totals'):
+            self.calculate_totals(template, sheet_type, set(document.label_matches[sheet_type].values()))
+        return template
+
+    def assign_items(self, sheet, formulas, template, items, sheet_type=None, customer=None,
+                     profile=NULL_PROFILE, progress=None):
+        """将原表项目一次性分配到模板项目并读取各期数据
+
+        返回 ({原表项目: 模板项目}, {原表项目: 匹配方式})，未分配的原表项目对应 NO_MATCH，
+        没有匹配方式。
+
+        客户已保存的对应关系先直接分配，其余项目与模板项目整体打分后做一对一分配，
+        避免行的先后顺序决定冲突的归属。
+        """
+        if progress is None:
+            progress = ProgressReporter()
+        labels = [item_name for item_name, _, _ in items]
+        with profile.stage('extract.match'):
+            matcher = compile_statement_matcher(template.names)
+            known = None
+            if self.mappings is not None and customer:
+                known = self.mappings.mappings(customer, sheet_type)
+            assignments = matcher.assign(labels, self.fuzzy_threshold, known)
+        if profile.enabled:
+            # 按匹配方式计数；打分的项目数相当于逐对调用 match_item_name 时的原表项目数
+            skipped = sum(1 for label in labels if known.get(label) == NO_MATCH) if known else 0
+            methods = [assignment.method for assignment in assignments]
+            profile.count('labels', len(labels))
+            profile.count('labels_scored', len(labels) - skipped - methods.count('learned'))
+            profile.count('labels_skipped', skipped)
+            for method in ('learned', 'exact', 'synonym', 'fuzzy'):
+                profile.count(f'matched_{method}', methods.count(method))
+            profile.count('unmatched', len(labels) - len(assignments))
+        learned = sum(1 for assignment in assignments if assignment.method == 'learned')
+        if learned:
+            self.log_message(f"使用客户 {customer} 已确认的对应关系匹配 {learned} 个项目", "INFO")
+        progress.update(75)
+
+        values = self.read_period_values(
+            sheet, formulas, [items[assignment.label_index][1:] for assignment in assignments], profile)
+        if assignments:
+            template.set_rows([assignment.template_name for assignment in assignments],
+                              [[row_values[period] for period in PERIODS] for row_values in values])
+        for assignment in assignments:
+            if assignment.method == 'fuzzy':
+                self.log_message(
+                    f"模糊匹配：{labels[assignment.label_index]} → {assignment.template_name.strip()}"
+                    f"（置信度 {assignment.score:.2f}）", "INFO")
+        progress.update(100)
+        matches = dict.fromkeys(labels, NO_MATCH)
+        matches.update((labels[assignment.label_index], assignment.template_name)
+                       for assignment in assignments)
+        methods = {labels[assignment.label_index]: assignment.method for assignment in assignments}
+
+        # 记录未匹配的项目（用于调试）
+        if not self.log_enabled("DEBUG"):
+            return matches, methods
+        assigned = {assignment.label_index for assignment in assignments}
+        for index, item_name in enumerate(labels):
+            if index not in assigned:
+                self.log_message(f"未匹配的原表项目：{item_name}", "DEBUG")
+        unmatched_items = set(template) - {assignment.template_name for assignment in assignments}
+        if unmatched_items:
+            self.log_message(f"未匹配的项目：{unmatched_items}", "DEBUG")
+        return matches, methods
+
+    def confirm_mappings(self, customer, document, methods=None):
+        """将文档最近一次提取的匹配结果保存为客户确认的对应关系，返回新增或修改的条数
+
+        methods 为要保存的匹配方式（如 AUTO_CONFIRM_METHODS），为None时全部保存，
+        包括未匹配的项目（保存为 NO_MATCH）。
+        """
+        if self.mappings is None or not customer:
+            return 0
+        changed = 0
+        for sheet_type, matches in document.label_matches.items():
+            if methods is not None:
+                match_methods = document.match_methods.get(sheet_type, {})
+                matches = {label: item for label, item in matches.items()
+                           if match_methods.get(label) in methods}
+            changed += self.mappings.record(customer, sheet_type, matches)
+        if changed:
+            self.log_message(f"已保存客户 {customer} 的项目对应关系 {changed} 条", "SUCCESS")
+        return changed
+
+    def read_period_values(self, sheet, formulas, cells, profile=NULL_PROFILE):
+        """批量获取各期数据
+
+        cells 为 [(行号, {期间: 列号})]，返回与之对应的 [{期间: 数值}]。
+        """
+        with profile.stage('extract.read_values'):
+            if not cells:
+                return []
+            column_indexes = sorted({col for _, columns in cells for col in columns.values() if col})
+            if not column_indexes:
+                return [{'本期': 0, '上期': 0, '年初': 0} for _ in cells]
+
+            # 所用的列一次性读取为DataFrame，再用一次索引取出匹配到的行并批量转换为数值
+            rows = np.array([row - 1 for row, _ in cells], dtype=np.int64)
+            frame = sheet.frame(column_indexes).take(rows)
+            numbers = to_numbers(frame)
+            missing = frame.isna().to_numpy()
+            positions = {col: position for position, col in enumerate(column_indexes)}
+
+            # 每个 (项目, 期间) 在取出的数据中的列位置，未选择的期间为-1
+            cols = np.array([[positions[columns[period]] if columns.get(period) else -1
+                              for period in PERIODS] for _, columns in cells], dtype=np.int64)
+            selected = cols >= 0
+            take_rows = np.broadcast_to(np.arange(len(cells))[:, None], cols.shape)
+            take_cols = np.where(selected, cols, 0)
+            values = np.where(selected, numbers[take_rows, take_cols], 0.0)
+            empty = selected & missing[take_rows, take_cols]
+            profile.count('cells_extracted', int(selected.sum()))
+
+            # 没有缓存值的公式单元格在值网格中为None，此时才查询公式索引；
+            # 普通的空单元格（如标题行）直接为0，不会加载公式版本
+            if empty.any():
+                with profile.stage('extract.read_values.formulas'):
+                    empty_cells = []
+                    for index, period_index in zip(*np.nonzero(empty)):
+                        row = int(rows[index]) + 1
+                        col_idx = column_indexes[cols[index, period_index]]
+                        if formulas.is_formula(row, col_idx):
+                            empty_cells.append((index, period_index, row, col_idx))
+                    if empty_cells:
+                        profile.count('formula_fallbacks', len(empty_cells))
+                    for index, period_index, row, col_idx in empty_cells:
+                        col = get_column_letter(col_idx)
+                        try:
+                            # 公式没有保存计算结果，数值按0处理
+                            formula = formulas.get(row, col_idx)
+                            if formula:
+                                profile.count('formula_failures')
+                                self.log_message(
+                                    f"无法计算公式结果: {sheet.title}!{col}{row} {formula}，"
+                                    f"请在Excel中打开并保存文件后重新转换", "WARNING")
+                        except Exception as e:
+                            profile.count('formula_failures')
+                            self.log_message(f"尝试从带公式的工作簿获取值时出错: {str(e)}", "WARNING")
+
+            results = []
+            log_values = self.log_enabled("DEBUG")
+            for index, (row, columns) in enumerate(cells):
+                row_values = {}
+                for period_index, period in enumerate(PERIODS):
+                    row_values[period] = float(values[index, period_index]) if selected[index, period_index] else 0
+                    # 记录获取的值
+                    if log_values and selected[index, period_index]:
+                        self.log_message(
+                            f"单元格 {sheet.title}!{get_column_letter(columns[period])}{row} 获取到的值: {row_values[period]}",
+                            "DEBUG")
+                results.append(row_values)
+            return results
+
+    def calculate_totals(self, template, sheet_type, present=()):
+        """计算所有期间的合计项，并填入原表中缺少的派生项目
+
+        present 为原表中有对应行的模板项目，其中的派生项目保留原表数值。
+        """
+        engine = compile_totals(sheet_type, template.names)
+        engine.apply(template.array)
+        for name, period, source, value in engine.derive(template.array, present):
+            self.log_message(
+                f"{SHEET_TITLES[sheet_type]} {name.strip()} {period}：原表数值 {source} 与按组成项目计算的 "
+                f"{value} 不一致，保留原表数值", "WARNING")
+
+    def update_item(self, processed_data, sheet_type, item_name, period, value):
+        """修正单个项目某一期间的值，只重算受其影响的合计项，返回被重算的合计项"""
+        template = processed_data[sheet_type]
+        engine = compile_totals(sheet_type, template.names)
+        affected = engine.update(template.array, item_name, value, period)
+        self.log_message(
+            f"修正 {SHEET_TITLES[sheet_type]} {item_name.strip()} {period}：{value}，"
+            f"重算合计项 {len(affected)} 个", "INFO")
+        return affected
+
+    def calculate_financial_indicators(self, bs, is_, cf):
+        """计算重点财务指标"""
+        indicators = {
+            '本期': {},
+            '上期': {},
+            '年初': {}
+        }
+
+        for period in ['本期', '上期', '年初']:
+            try:
+                # 1. 资产负债率（%）
+                if bs['资产总计'].get(period, 0) != 0:
+                    indicators[period]['资产负债率'] = \
+                        (bs['负债合计'].get(period, 0) / bs['资产总计'].get(period, 0)) * 100
+
+                # 2. 流动比率（%）
+                if bs['流动负债合计'].get(period, 0) != 0:
+                    indicators[period]['流动比率'] = \
+                        (bs['流动资产合计'].get(period, 0) / bs['流动负债合计'].get(period, 0)) * 100
+
+                # 3. 速动比率（%）
+                quick_assets = bs['流动资产合计'].get(period, 0) \
+                             - bs['    存货'].get(period, 0) \
+                             - bs['    预付款项'].get(period, 0) \
+                             - bs.get('    待摊费用', {}).get(period, 0)
+
+                if bs['流动负债合计'].get(period, 0) != 0:
+                    indicators[period]['速动比率'] = \
+                        (quick_assets / bs['流动负债合计'].get(period, 0)) * 100
+
+                # 4. 利息保障倍数
+                finance_cost = is_['    财务费用（收益以"－"号填列）'].get(period, 0)
+                if finance_cost != 0:
+                    total_profit = is_['三、利润总额（亏损总额以"－"填列）'].get(period, 0)
+                    indicators[period]['利息保障倍数'] = (total_profit + finance_cost) / finance_cost
+
+                # 5. 总资产周转率（次）
+                if period != '年初':
+                    avg_total_assets = (bs['资产总计'].get(period, 0) + bs['资产总计'].get('年初', 0)) / 2
+                    if avg_total_assets != 0:
+                        indicators[period]['总资产周转率'] = \
+                            is_['一、营业总收入'].get(period, 0) / avg_total_assets
+
+                # 6. 净资产收益率（%）
+                if bs['所有者权益（或股东权益）合计'].get(period, 0) != 0:
+                    indicators[period]['净资产收益率'] = \
+                        (is_['四、净利润（净亏损以"－"号填列）'].get(period, 0) /
+                         bs['所有者权益（或股东权益）合计'].get(period, 0)) * 100
+
+                # 7. 销售利润率（%）
+                if is_['一、营业总收入'].get(period, 0) != 0:
+                    indicators[period]['销售利润率'] = \
+                        (is_['二、营业利润（亏损以"－"填列）'].get(period, 0) /
+                         is_['一、营业总收入'].get(period, 0)) * 100
+
+                # 8. 经营活动现金流量/销售收入
+                if is_['一、营业总收入'].get(period, 0) != 0:
+                    indicators[period]['经营活动现金流量/销售收入'] = \
+                        cf['    经营活动产生的现金流量净额'].get(period, 0) / \
+                        is_['一、营业总收入'].get(period, 0)
+
+                # 9. 存货周转率（次）
+                if period != '年初':
+                    avg_inventory = (bs['    存货'].get(period, 0) + bs['    存货'].get('年初', 0)) / 2
+                    if avg_inventory != 0:
+                        indicators[period]['存货周转率'] = \
+                            is_['    减：营业成本'].get(period, 0) / avg_inventory
+
+                # 10. 应收账款周转率（次）
+                if period != '年初':
+                    avg_accounts_receivable = (bs['    应收账款'].get(period, 0) +
+                                             bs['    应收账款'].get('年初', 0)) / 2
+                    if avg_accounts_receivable != 0:
+                        indicators[period]['应收账款周转率'] = \
+                            is_['一、营业总收入'].get(period, 0) / avg_accounts_receivable
+
+                # 11. 销售增长率（%）
+                if period == '本期' and is_['一、营业总收入'].get('上期', 0) != 0:
+                    indicators[period]['销售增长率'] = \
+                        ((is_['一、营业总收入'].get(period, 0) -
+                          is_['一、营业总收入'].get('上期', 0)) /
+                         is_['一、营业总收入'].get('上期', 0)) * 100
+
+                # 12. 总资产增长率（%）
+                if period == '本期' and bs['资产总计'].get('上期', 0) != 0:
+                    indicators[period]['总资产增长率'] = \
+                        ((bs['资产总计'].get(period, 0) - bs['资产总计'].get('上期', 0)) /
+                         bs['资产总计'].get('上期', 0)) * 100
+
+                # 13. 资本积累率（%）
+                if period == '本期' and bs['所有者权益（或股东权益）合计'].get('上期', 0) != 0:
+                    indicators[period]['资本积累率'] = \
+                        ((bs['所有者权益（或股东权益）合计'].get(period, 0) -
+                          bs['所有者权益（或股东权益）合计'].get('上期', 0)) /
+                         bs['所有者权益（或股东权益）合计'].get('上期', 0)) * 100
+
+                # 14. 总资产报酬率（%）
+                if bs['资产总计'].get(period, 0) != 0:
+                    indicators[period]['总资产报酬率'] = \
+                        ((is_['三、利润总额（亏损总额以"－"填列）'].get(period, 0) +
+                          is_['    财务费用（收益以"－"号填列）'].get(period, 0)) /
+                         bs['资产总计'].get(period, 0)) * 100
+
+                # 15. 成本费用利润率（%）
+                total_cost = (is_['    减：营业成本'].get(period, 0) +
+                            is_['    营业税金及附加'].get(period, 0) +
+                            is_['    销售费用'].get(period, 0) +
+                            is_['    管理费用'].get(period, 0) +
+                            is_['    财务费用（收益以"－"号填列）'].get(period, 0))
+                if total_cost != 0:
+                    indicators[period]['成本费用利润率'] = \
+                        (is_['二、营业利润（亏损以"－"填列）'].get(period, 0) / total_cost) * 100
+
+                # 16. 总债务/EBITDA
+                ebitda = (is_['三、利润总额（亏损总额以"－"填列）'].get(period, 0) +
+                         is_['    财务费用（收益以"－"号填列）'].get(period, 0) +
+                         bs.get('    固定资产折旧', {}).get(period, 0) +
+                         bs.get('    无形资产摊销', {}).get(period, 0) +
+                         bs.get('    长期待摊费用摊销', {}).get(period, 0))
+                if ebitda != 0:
+                    indicators[period]['总债务/EBITDA'] = \
+                        bs['负债合计'].get(period, 0) / ebitda
+
+                # 17. 全部资本化比率（%）
+                total_borrowings = (bs['    短期借款'].get(period, 0) +
+                                  bs['    长期借款'].get(period, 0))
+                denominator = total_borrowings + bs['所有者权益（或股东权益）合计'].get(period, 0)
+                if denominator != 0:
+                    indicators[period]['全部资本化比率'] = \
+                        (total_borrowings / denominator) * 100
+
+                # 18. 经营活动现金净流量/总债务
+                if bs['负债合计'].get(period, 0) != 0:
+                    indicators[period]['经营活动现金净流量/总债务'] = \
+                        cf['    经营活动产生的现金流量净额'].get(period, 0) / \
+                        bs['负债合计'].get(period, 0)
+
+                # 19. 流动资产周转率（次）
+                if period != '年初':
+                    avg_current_assets = (bs['流动资产合计'].get(period, 0) +
+                                        bs['流动资产合计'].get('年初', 0)) / 2
+                    if avg_current_assets != 0:
+                        indicators[period]['流动资产周转率'] = \
+                            is_['一、营业总收入'].get(period, 0) / avg_current_assets
+
+                # 20. 已获利息倍数
+                if is_['    财务费用（收益以"－"号填列）'].get(period, 0) != 0:
+                    indicators[period]['已获利息倍数'] = \
+                        ((is_['三、利润总额（亏损总额以"－"填列）'].get(period, 0) +
+                          is_['    财务费用（收益以"－"号填列）'].get(period, 0)) /
+                         is_['    财务费用（收益以"－"号填列）'].get(period, 0))
+
+                # 21. 营业收入现金含量（%）
+                if is_['一、营业总收入'].get(period, 0) != 0:
+                    indicators[period]['营业收入现金含量'] = \
+                        (cf['    销售商品、提供劳务收到的现金'].get(period, 0) /
+                         is_['一、营业总收入'].get(period, 0)) * 100
+
+                # 22. 经营活动现金净流量/流动负债（%）
+                if bs['流动负债合计'].get(period, 0) != 0:
+                    indicators[period]['经营活动现金净流量/流动负债'] = \
+                        (cf['    经营活动产生的现金流量净额'].get(period, 0) /
+                         bs['流动负债合计'].get(period, 0)) * 100
+
+            except Exception as e:
+                self.log_message(f"计算{period}指标时出错：{str(e)}", "ERROR")
+
+        return indicators
+
+    def export(self, processed_data, save_path, indicators=None, profile=NULL_PROFILE):
+        """导出数据到Excel
+
+        使用只写模式的工作簿逐行写出，列宽在写出前根据数据计算，表头样式每个工作簿只注册一次。
+        启用性能记录时，本次转换的记录保存在导出文件旁边（见 write_profile）。
+        """
+        with profile.stage('export'):
+            workbook = openpyxl.Workbook(write_only=True)
+            self.log_message("开始导出数据...", "INFO")
+
+            # 设置表头样式
+            header_style = openpyxl.styles.NamedStyle(name='header')
+            header_style.font = openpyxl.styles.Font(bold=True)
+            header_style.fill = openpyxl.styles.PatternFill(start_color='CCCCCC', end_color='CCCCCC', fill_type='solid')
+            workbook.add_named_style(header_style)
+
+            # 导出各个报表数据
+            for sheet_type in SHEET_TYPES:
+                self.export_sheet(workbook, SHEET_TITLES[sheet_type], processed_data[sheet_type])
+
+            # 计算并导出财务指标
+            if indicators is None:
+                self.log_message("计算财务指标...", "INFO")
+                indicators = self.calculate_financial_indicators(
+                    processed_data['balance_sheet'],
+                    processed_data['income_statement'],
+                    processed_data['cash_flow']
+                )
+            self.export_financial_indicators(workbook, indicators)
+
+            self.save_workbook(workbook, save_path)
+        self.log_message(f"数据已导出到：{os.path.basename(save_path)}", "SUCCESS")
+        self.write_profile(profile, save_path)
+        return save_path
+
+    def export_long(self, processed_data, save_path, indicators=None, company=None, fmt=None,
+                    profile=NULL_PROFILE):
+        """以长表格式（CSV / JSON Lines / Parquet）导出报表数据和财务指标
+
+        company 默认为保存文件名，fmt 默认按扩展名判断。
+        """
+        with profile.stage('export'):
+            if indicators is None:
+                indicators = self.calculate_financial_indicators(
+                    processed_data['balance_sheet'],
+                    processed_data['income_statement'],
+                    processed_data['cash_flow']
+                )
+            if company is None:
+                company = os.path.splitext(os.path.basename(save_path))[0]
+            writer = open_long_writer(save_path, fmt)
+            try:
+                writer.write(list(long_rows(company, processed_data, indicators)))
+            finally:
+                writer.close()
+        self.log_message(f"数据已导出到：{os.path.basename(save_path)}", "SUCCESS")
+        self.write_profile(profile, save_path)
+        return save_path
+
+    def write_profile(self, profile, save_path):
+        """将性能记录以JSON文件保存在导出文件旁边（未启用性能记录时不保存）"""
+        if not profile.enabled:
+            return None
+        path = profile.write_json(profile_path(save_path))
+        self.log_message(f"性能记录已保存到：{os.path.basename(path)}", "INFO")
+        return path
+
+    def export_sheet(self, workbook, sheet_name, data):
+        """导出单个sheet的数据"""
+        ws = workbook.create_sheet(sheet_name)
+
+        # 表头使用工作簿中已注册的表头样式
+        headers = ["科目名称", "行次", "本期", "上期", "年初"]
+        rows = [
+            [item_name, line, *values]
+            for item_name, line, values in zip(data.names, data.registry.line_numbers, data.array.tolist())
+        ]
+        self.write_rows(ws, headers, rows, header_style='header')
+
+    def export_financial_indicators(self, workbook, indicators):
+        """导出重点财务指标"""
+        ws = workbook.create_sheet("重点财务指标")
+
+        # 设置表头
+        headers = ["指标", "本期", "上期", "年初"]
+
+        # 定义指标顺序和格式化
+        indicator_formats = {
+            "资产负债率": {"suffix": "%", "decimals": 2},
+            "流动比率": {"suffix": "%", "decimals": 2},
+            "总债务/EBITDA": {"suffix": "", "decimals": 2},
+            "全部资本化比率": {"suffix": "%", "decimals": 2},
+            "已获利息倍数": {"suffix": "", "decimals": 2},
+            "速动比率": {"suffix": "%", "decimals": 2},
+            "经营活动现金净流量/总债务": {"suffix": "", "decimals": 2},
+            "净资产收益率": {"suffix": "%", "decimals": 2},
+            "销售利润率": {"suffix": "%", "decimals": 2},
+            "总资产收益率": {"suffix": "%", "decimals": 2},
+            "经营活动现金流入量/销售收入": {"suffix": "", "decimals": 2},
+            "成本费用利润率": {"suffix": "%", "decimals": 2},
+            "总资产周转率": {"suffix": "次", "decimals": 2},
+            "流动资产周转率": {"suffix": "次", "decimals": 2},
+            "存货周转率": {"suffix": "次", "decimals": 2},
+            "应收账款周转率": {"suffix": "次", "decimals": 2},
+            "销售增长率": {"suffix": "%", "decimals": 2},
+            "资本积累率": {"suffix": "%", "decimals": 2},
+            "总资产增长率": {"suffix": "%", "decimals": 2},
+            "销售利润率": {"suffix": "%", "decimals": 2},
+            "总资产报酬率": {"suffix": "%", "decimals": 2},
+            "利息保障倍数": {"suffix": "", "decimals": 2},
+            "总债务/EBITDA": {"suffix": "", "decimals": 2},
+            "全部资本化比率": {"suffix": "%", "decimals": 2},
+            "经营活动现金净流量/总债务": {"suffix": "", "decimals": 2},
+            "流动资产周转率": {"suffix": "次", "decimals": 2},
+            "已获利息倍数": {"suffix": "", "decimals": 2},
+            "营业收入现金含量": {"suffix": "%", "decimals": 2},
+            "经营活动现金净流量/流动负债": {"suffix": "%", "decimals": 2}
+        }
+
+        # 写入数据
+        rows = []
+        for indicator, format_info in indicator_formats.items():
+            # 写入指标名称
+            row = [f"{indicator}({format_info['suffix']})" if format_info['suffix'] else indicator]
+
+            # 写入各期间数据
+            for period in ['本期', '上期', '年初']:
+                value = indicators.get(period, {}).get(indicator)
+                if isinstance(value, (int, float)):
+                    row.append(round(value, format_info['decimals']))
+                else:
+                    row.append(None)
+            rows.append(row)
+
+        self.write_rows(ws, headers, rows)
+
+    def write_rows(self, ws, headers, rows, header_style=None):
+        """向只写worksheet写入表头和数据
+
+        只写模式下列宽必须在写入第一行之前设置，因此先在数据上累计各列的最大长度。
+        """
+        widths = [len(str(header)) for header in headers]
+        for row in rows:
+            for col, value in enumerate(row):
+                if value is not None:
+                    length = len(str(value))
+                    if length > widths[col]:
+                        widths[col] = length
+
+        # 调整列宽
+        for col, width in enumerate(widths, start=1):
+            ws.column_dimensions[get_column_letter(col)].width = width + 2
+
+        if header_style:
+            header_cells = []
+            for header in headers:
+                cell = WriteOnlyCell(ws, value=header)
+                cell.style = header_style
+                header_cells.append(cell)
+            ws.append(header_cells)
+        else:
+            ws.append(headers)
+        for row in rows:
+            ws.append(row)
+
+    def save_workbook(self, workbook, save_path):
+        """按照所选的压缩方式保存工作簿"""
+        compression, level = COMPRESSION_PROFILES[self.compression]
+        archive = ZipFile(save_path, 'w', compression, allowZip64=True, compresslevel=level)
+        workbook.properties.modified = datetime.datetime.now(tz=datetime.timezone.utc).replace(tzinfo=None)
+        ExcelWriter(workbook, archive).save()
@@ -0,0 +1,119 @@
+"""转换过程的性能记录
+
+每次转换记录各阶段的用时（加载、读取sheet、预处理、期间列识别、提取及其中的匹配、
+读取数值、公式回退和合计、财务指标、导出）和计数（读取的单元格数、项目匹配方式、
+解析缓存和项目名称缓存的命中、公式回退等），导出时以JSON文件保存在导出文件旁边，
+批量转换时打印出来。
+
+未启用时使用 NULL_PROFILE，所有记录方法都是空操作；需要遍历数据才能得到的计数
+只在 profile.enabled 为 True 时才计算。界面中可以设置环境变量 REPORT_PROFILE=1 启用。
+"""
+import contextlib
+import json
+import os
+import time
+
+# 性能记录文件的扩展名（替换导出文件的扩展名）
+PROFILE_SUFFIX = '.profile.json'
+
+
+def profiling_enabled():
+    """是否通过环境变量 REPORT_PROFILE 启用了性能记录"""
+    return os.environ.get('REPORT_PROFILE', '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+class ConversionProfile:
+    """一次转换的各阶段用时和计数
+
+    阶段名称用"."表示包含关系，如 extract.match 的用时包含在 extract 中；
+    同名阶段多次执行时用时累加。
+    """
+
+    enabled = True
+
+    def __init__(self, file_path=None):
+        self.file_path = file_path
+        self.stages = {}
+        self.calls = {}
+        self.counters = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """记录一个阶段的用时"""
+        # 先占位，使外层阶段排在它包含的阶段之前
+        self.stages.setdefault(name, 0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] += time.perf_counter() - start
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def count(self, name, value=1):
+        """累加计数"""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self):
+        """转换为可以保存为JSON的字典"""
+        return {
+            'file': self.file_path,
+            'total_seconds': sum(seconds for name, seconds in self.stages.items() if '.' not in name),
+            'stages': {name: {'seconds': seconds, 'calls': self.calls[name]}
+                       for name, seconds in self.stages.items()},
+            'counters': dict(self.counters)
+        }
+
+    def write_json(self, path):
+        """保存为JSON文件"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=1)
+        return path
+
+
+class NullProfile:
+    """未启用性能记录时使用的空记录"""
+
+    enabled = False
+    _context = contextlib.nullcontext()
+
+    def stage(self, name):
+        return self._context
+
+    def count(self, name, value=1):
+        pass
+
+
+NULL_PROFILE = NullProfile()
+
+
+def profile_path(save_path):
+    """导出文件对应的性能记录文件路径"""
+    return os.path.splitext(save_path)[0] + PROFILE_SUFFIX
+
+
+def merge_profiles(profiles):
+    """合并多个文件的性能记录字典（用时和计数分别累加）"""
+    merged = {'file': None, 'total_seconds': 0.0, 'stages': {}, 'counters': {}}
+    for profile in profiles:
+        merged['total_seconds'] += profile['total_seconds']
+        for name, stage in profile['stages'].items():
+            total = merged['stages'].setdefault(name, {'seconds': 0.0, 'calls': 0})
+            total['seconds'] += stage['seconds']
+            total['calls'] += stage['calls']
+        for name, value in profile['counters'].items():
+            merged['counters'][name] = merged['counters'].get(name, 0) + value
+    return merged
+
+
+def format_profile(profile, indent="  "):
+    """性能记录字典的显示文本：每个阶段一行（按包含关系缩进），计数合并为一行"""
+    lines = []
+    total = profile['total_seconds']
+    for name, stage in profile['stages'].items():
+        depth = name.count('.')
+        share = f"{stage['seconds'] / total * 100:5.1f}%" if total else ""
+        lines.append(f"{indent}{'  ' * depth}{name.rsplit('.', 1)[-1]:<{24 - 2 * depth}}"
+                     f"{stage['seconds'] * 1000:10.1f} ms {share}")
+    if profile['counters']:
+        lines.append(indent + "，".join(f"{name}={value}" for name, value in profile['counters'].items()))
+    return "\n".join(lines)
@@ -0,0 +1,84 @@
+"""进度报告
+
+处理循环中每一行都可以调用 ProgressReporter.update，报告器按时间节流，
+只有距离上次通知超过一定间隔时才调用回调，因此循环本身不会直接触发界面刷新。
+界面和命令行都通过回调 callback(percent, eta) 接收进度，eta 为预计剩余秒数（未知时为None）。
+"""
+import time
+
+# 默认每秒最多通知的次数
+MAX_UPDATES_PER_SECOND = 20
+
+# 进度达到该百分比后才估算剩余时间
+MIN_PERCENT_FOR_ETA = 1
+
+
+class ProgressReporter:
+    """按时间节流并估算剩余时间的进度报告器
+
+    整个任务的进度为 0-100，可以用 section 把一个阶段映射到其中的一段，
+    阶段内部仍按 0-100 报告。
+    """
+
+    def __init__(self, callback=None, max_rate=MAX_UPDATES_PER_SECOND, clock=time.monotonic):
+        self.callback = callback
+        self.interval = 1.0 / max_rate if max_rate else 0.0
+        self.clock = clock
+        self.percent = 0.0
+        self._started = None
+        self._last = None
+        self._section = (0.0, 100.0)
+
+    def begin(self):
+        """开始一个新任务，重置进度和计时"""
+        self.percent = 0.0
+        self._started = self.clock()
+        self._last = None
+        self._section = (0.0, 100.0)
+        self._notify(self._started)
+
+    def section(self, start, end):
+        """之后的 update 都报告 start 到 end 这一段内的进度"""
+        self._section = (start, end)
+
+    def update(self, percent, force=False):
+        """报告当前阶段的进度（0-100）"""
+        start, end = self._section
+        overall = start + (end - start) * min(max(percent, 0), 100) / 100
+        now = self.clock()
+        if self._started is None:
+            self._started = now
+        self.percent = overall
+        if force or self._last is None or now - self._last >= self.interval:
+            self._notify(now)
+
+    def finish(self):
+        """任务完成，总是通知一次100%"""
+        self._section = (0.0, 100.0)
+        self.percent = 100.0
+        self._notify(self.clock())
+
+    def eta(self, now=None):
+        """根据已用时间和当前进度估算剩余秒数，进度太少时无法估算，返回None"""
+        if self._started is None or self.percent < MIN_PERCENT_FOR_ETA:
+            return None
+        if self.percent >= 100:
+            return 0.0
+        elapsed = (self.clock() if now is None else now) - self._started
+        return elapsed * (100 - self.percent) / self.percent
+
+    def _notify(self, now):
+        self._last = now
+        if self.callback:
+            self.callback(self.percent, self.eta(now))
+
+
+def format_eta(seconds):
+    """将剩余秒数格式化为显示文本"""
+    if seconds is None:
+        return ""
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"剩余约 {seconds} 秒"
+    minutes, seconds = divmod(seconds, 60)
+    return f"剩余约 {minutes} 分 {seconds} 秒"
@@ -0,0 +1,167 @@
+"""报表数据
+
+转换后的每张报表由两部分组成：
+- ItemRegistry：模板项目的固定登记表（项目名称、行次、项目编号），每种模板只建立一次，
+  所有文件、所有公司共用；
+- Statement：一个 项目 × 期间 的 float64 数组，行为项目编号，列为 PERIODS。
+
+合计项计算、导出等直接使用数组；为了兼容按名称访问的代码，Statement 也可以像原来的
+{项目名称: {'行次', '本期', '上期', '年初'}} 字典一样使用，单个项目返回 ItemValues 视图，
+读写都直接作用在数组上。复制一张报表只需复制数组，项目登记表不会被复制也不会被修改。
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from Rtotals import PERIODS
+
+# '行次' 以外的键在数组中的列
+_PERIOD_COLUMNS = {period: column for column, period in enumerate(PERIODS)}
+
+# 单个项目的键
+ITEM_KEYS = ('行次',) + PERIODS
+
+
+class ItemRegistry:
+    """一种报表模板的项目登记表，项目编号即模板中的顺序"""
+
+    __slots__ = ('statement', 'names', 'line_numbers', 'ids')
+
+    def __init__(self, statement, items):
+        self.statement = statement
+        self.names = tuple(name for name, _ in items)
+        self.line_numbers = tuple(line for _, line in items)
+        self.ids = {name: item_id for item_id, name in enumerate(self.names)}
+        if len(self.ids) != len(self.names):
+            raise ValueError(f"{statement} 模板中有重复的项目")
+
+    def __len__(self):
+        return len(self.names)
+
+
+@lru_cache(maxsize=None)
+def item_registry(statement, items):
+    """获取模板的项目登记表（相同的模板只建立一次）
+
+    items 为 ((项目名称, 行次), ...)。
+    """
+    return ItemRegistry(statement, items)
+
+
+class Statement:
+    """一张报表的数据：项目登记表 + 项目 × 期间 的 float64 数组
+
+    数组按行存储，合计项矩阵乘法的累加顺序与逐项目计算时一致；period() 返回的
+    每个期间的一列是不复制数据的视图。
+    """
+
+    __slots__ = ('registry', 'array')
+
+    def __init__(self, registry, array=None):
+        self.registry = registry
+        if array is None:
+            array = np.zeros((len(registry), len(PERIODS)), dtype=np.float64)
+        elif array.shape != (len(registry), len(PERIODS)):
+            raise ValueError(f"数组形状 {array.shape} 与模板项目数 {len(registry)} 不一致")
+        self.array = array
+
+    @classmethod
+    def from_items(cls, statement, items):
+        """由 [(项目名称, 行次)] 建立各期间都为0的空白报表"""
+        return cls(item_registry(statement, tuple(items)))
+
+    @property
+    def statement(self):
+        return self.registry.statement
+
+    @property
+    def names(self):
+        return self.registry.names
+
+    def period(self, period):
+        """某一期间所有项目的值（数组视图，修改会直接作用在报表上）"""
+        return self.array[:, _PERIOD_COLUMNS[period]]
+
+    def clone(self):
+        """复制报表数据，项目登记表共用"""
+        return Statement(self.registry, self.array.copy())
+
+    def set_rows(self, names, values):
+        """按项目名称批量写入各期间的值，values 为 项目 × 期间 的数组"""
+        self.array[[self.registry.ids[name] for name in names], :] = values
+
+    def to_dict(self):
+        """转换为 {项目名称: {'行次', '本期', '上期', '年初'}} 字典"""
+        return {name: dict(zip(ITEM_KEYS, (line, *row)))
+                for name, line, row in zip(self.names, self.registry.line_numbers, self.array.tolist())}
+
+    # 以下方法使报表可以像 {项目名称: {...}} 字典一样使用
+
+    def __getitem__(self, name):
+        return ItemValues(self, self.registry.ids[name])
+
+    def get(self, name, default=None):
+        item_id = self.registry.ids.get(name)
+        return default if item_id is None else ItemValues(self, item_id)
+
+    def __contains__(self, name):
+        return name in self.registry.ids
+
+    def __iter__(self):
+        return iter(self.registry.names)
+
+    def __len__(self):
+        return len(self.registry)
+
+    def keys(self):
+        return self.registry.names
+
+    def values(self):
+        return [ItemValues(self, item_id) for item_id in range(len(self.registry))]
+
+    def items(self):
+        return [(name, ItemValues(self, item_id)) for item_id, name in enumerate(self.registry.names)]
+
+
+class ItemValues:
+    """报表中一个项目的视图，可以像 {'行次', '本期', '上期', '年初'} 字典一样读写"""
+
+    __slots__ = ('statement', 'item_id')
+
+    def __init__(self, statement, item_id):
+        self.statement = statement
+        self.item_id = item_id
+
+    def __getitem__(self, key):
+        if key == '行次':
+            return self.statement.registry.line_numbers[self.item_id]
+        return float(self.statement.array[self.item_id, _PERIOD_COLUMNS[key]])
+
+    def __setitem__(self, key, value):
+        if key not in _PERIOD_COLUMNS:
+            raise KeyError(key)
+        self.statement.array[self.item_id, _PERIOD_COLUMNS[key]] = value
+
+    def get(self, key, default=None):
+        if key == '行次' or key in _PERIOD_COLUMNS:
+            return self[key]
+        return default
+
+    def update(self, values):
+        for key, value in dict(values).items():
+            self[key] = value
+
+    def __iter__(self):
+        return iter(ITEM_KEYS)
+
+    def __len__(self):
+        return len(ITEM_KEYS)
+
+    def keys(self):
+        return ITEM_KEYS
+
+    def items(self):
+        return [(key, self[key]) for key in ITEM_KEYS]
+
+    def __repr__(self):
+        return repr(dict(self.items()))
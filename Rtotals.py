@@ -0,0 +1,287 @@
+"""合计项计算
+
+合计规则以数据表示：每个合计项由若干项目按正负号相加得到，项目本身也可以是合计项。
+规则编译为依赖图（有向无环图）：
+- 完整计算时，规则展开为 合计项 × 项目 的汇总矩阵，模板数据表示为 项目 × 期间 的数组，
+  所有期间（以及多家公司叠在一起的数据）的所有合计项都由一次矩阵乘法得到；
+- 修改单个项目时，只按依赖顺序重算引用了它的合计项。
+派生项目（如现金流量净额、利润总额、净利润）不参与汇总矩阵，原表中缺少时才按依赖顺序
+由组成项目计算填入。
+"""
+from functools import lru_cache
+
+import numpy as np
+
+# 数组中各列对应的期间
+PERIODS = ('本期', '上期', '年初')
+
+# 各报表的合计规则：(合计项, [(项目, 符号), ...])
+TOTAL_RULES = {
+    'balance_sheet': [
+        ('流动资产合计', [(name, 1) for name in [
+            '    货币资金', '    交易性金融资产', '    应收票据', '    应收账款',
+            '    预付款项', '    应收利息', '    应收股利', '    其他应收款',
+            '    存货', '    一年内到期的非流动资产', '    其他流动资产', '    待摊费用'
+        ]]),
+        ('非流动资产合计', [(name, 1) for name in [
+            '    可供出售金融资产', '    持有至到期投资', '    长期应收款',
+            '    长期股权投资', '    投资性房地产', '    固定资产', '    在建工程',
+            '    工程物资', '    固定资产清理', '    生产性生物资产', '    油气资产',
+            '    无形资产', '    开发支出', '    商誉', '    长期待摊费用',
+            '    递延所得税资产', '    其他非流动资产', '    其它长期资产'
+        ]]),
+        ('资产总计', [('流动资产合计', 1), ('非流动资产合计', 1)]),
+        ('流动负债合计', [(name, 1) for name in [
+            '    短期借款', '    交易性金融负债', '    应付票据', '    应付账款',
+            '    预收款项', '    应付职工薪酬', '    应交税费', '    应付利息',
+            '    应付股利', '    其他应付款', '    预提费用',
+            '    一年内到期的非流动负债', '    其他流动负债'
+        ]]),
+        ('非流动负债合计', [(name, 1) for name in [
+            '    长期借款', '    应付债券', '    长期应付款', '    专项应付款',
+            '    预计负债', '    递延所得税负债', '    其他非流动负债'
+        ]]),
+        ('负债合计', [('流动负债合计', 1), ('非流动负债合计', 1)]),
+        ('所有者权益（或股东权益）合计', [(name, 1) for name in [
+            '    股本', '    资本公积', '    盈余公积', '    未分配利润',
+            '    少数股东权益', '    未结清对外担保余额'
+        ]] + [('    减：库存股', -1)]),
+        ('负债和所有者权益（或股东权益）总计', [('负债合计', 1), ('所有者权益（或股东权益）合计', 1)]),
+    ],
+    'cash_flow': [
+        ('    经营活动现金流入小计', [(name, 1) for name in [
+            '    销售商品、提供劳务收到的现金', '    收到的税费返还',
+            '    收到其他与经营活动有关的现金'
+        ]]),
+        ('    经营活动现金流出小计', [(name, 1) for name in [
+            '    购买商品、接受劳务支付的现金', '    支付给职工以及为职工支付的现金',
+            '    支付的各项税费', '    支付其他与经营活动有关的现金'
+        ]]),
+        ('    投资活动现金流入小计', [(name, 1) for name in [
+            '    收回投资收到的现金', '    取得投资收益收到的现金',
+            '    处置固定资产、无形资产和其他长期资产收回的现金净额',
+            '    处置子公司及其他营业单位收到的现金净额', '    收到其他与投资活动有关的现金'
+        ]]),
+        ('    投资活动现金流出小计', [(name, 1) for name in [
+            '    购建固定资产、无形资产和其他长期资产支付的现金', '    投资支付的现金',
+            '    取得子公司及其他营业单位支付的现金净额', '    支付其他与投资活动有关的现金'
+        ]]),
+        ('    筹资活动现金流入小计', [(name, 1) for name in [
+            '    吸收投资收到的现金', '    取得借款收到的现金', '    收到其他与筹资活动有关的现金'
+        ]]),
+        ('    筹资活动现金流出小计', [(name, 1) for name in [
+            '    偿还债务支付的现金', '    分配股利、利润或偿付利息支付的现金',
+            '    支付其他与筹资活动有关的现金'
+        ]]),
+    ],
+    'income_statement': [
+        ('二、营业利润（亏损以"－"填列）', [
+            ('一、营业总收入', 1),
+            ('    减：营业成本', -1),
+            ('    营业税金及附加', -1),
+            ('    销售费用', -1),
+            ('    管理费用', -1),
+            ('    财务费用（收益以"－"号填列）', -1),
+            ('    资产减值损失', -1),
+            ('    加：公允价值变动净收益（净损失以"－"号填列）', 1),
+            ('    投资收益（净损失以"－"号填列）', 1),
+        ]),
+    ],
+}
+
+# 派生项目：(项目, [(组成项目, 符号), ...])
+# 模板没有列出所有明细项目（如研发费用、其他收益、信用减值损失），任何明细未匹配都会使
+# 重算结果偏离原表，因此原表中有对应行的派生项目保留原值（与计算结果不一致时给出警告），
+# 只有缺少时才按组成项目计算填入。
+DERIVED_RULES = {
+    'balance_sheet': [],
+    'cash_flow': [
+        ('    经营活动产生的现金流量净额', [('    经营活动现金流入小计', 1), ('    经营活动现金流出小计', -1)]),
+        ('    投资活动产生的现金流量净额', [('    投资活动现金流入小计', 1), ('    投资活动现金流出小计', -1)]),
+        ('    筹资活动产生的现金流量净额', [('    筹资活动现金流入小计', 1), ('    筹资活动现金流出小计', -1)]),
+        ('五、现金及现金等价物增加额', [
+            ('    经营活动产生的现金流量净额', 1),
+            ('    投资活动产生的现金流量净额', 1),
+            ('    筹资活动产生的现金流量净额', 1),
+            ('四、汇率变动对现金及现金等价物的影响', 1),
+        ]),
+    ],
+    'income_statement': [
+        ('三、利润总额（亏损总额以"－"填列）', [
+            ('二、营业利润（亏损以"－"填列）', 1),
+            ('    加：营业外收入', 1),
+            ('    减：营业外支出', -1),
+        ]),
+        ('四、净利润（净亏损以"－"号填列）', [
+            ('三、利润总额（亏损总额以"－"填列）', 1),
+            ('    减：所得税费用', -1),
+        ]),
+    ],
+}
+
+# 派生项目的原值与计算值相差超过该值时给出警告（元）
+MISMATCH_TOLERANCE = 0.01
+
+
+
+class TotalsEngine:
+    """一张报表的合计项计算器
+
+    规则的声明顺序不限，构建时按依赖关系排序，存在循环引用时抛出 ValueError。
+    汇总矩阵的每一行对应一个合计项，只引用非合计项目（嵌套的合计项在构建时已展开），
+    因此一次矩阵乘法即可得到所有合计项。派生项目（derived_rules）可以引用合计项，
+    不进入汇总矩阵，由 derive 按依赖顺序逐个计算。
+    """
+
+    def __init__(self, item_names, rules, derived_rules=()):
+        self.item_names = tuple(item_names)
+        self.positions = {name: position for position, name in enumerate(self.item_names)}
+
+        # 只保留模板中存在的合计项、派生项目和项目
+        self.rules = {
+            total: [(name, sign) for name, sign in components if name in self.positions]
+            for total, components in list(rules) + list(derived_rules) if total in self.positions
+        }
+        derived = {total for total, _ in derived_rules if total in self.positions}
+
+        # 依赖图：项目 → 直接引用它的合计项
+        self._dependents = {}
+        for total, components in self.rules.items():
+            for name, _ in components:
+                self._dependents.setdefault(name, []).append(total)
+
+        order = self._topological_order()
+        self._order = {total: index for index, total in enumerate(order)}
+        self.total_names = tuple(total for total in order if total not in derived)
+        self.derived_names = tuple(total for total in order if total in derived)
+        self.total_positions = np.array([self.positions[name] for name in self.total_names],
+                                        dtype=np.int64)
+
+        # 每个合计项的直接组成项目（位置, 符号），用于增量重算
+        self._rule_arrays = {
+            total: (np.array([self.positions[name] for name, _ in components], dtype=np.int64),
+                    np.array([sign for _, sign in components], dtype=float))
+            for total, components in self.rules.items()
+        }
+
+        # 按依赖顺序展开嵌套的合计项，得到每个合计项对各基础项目的系数
+        expanded = {}
+        for total in self.total_names:
+            coefficients = {}
+            for name, sign in self.rules[total]:
+                if name in derived:
+                    raise ValueError(f"合计项 {total.strip()} 不能引用派生项目 {name.strip()}")
+                if name in expanded:
+                    for base, weight in expanded[name].items():
+                        coefficients[base] = coefficients.get(base, 0) + sign * weight
+                else:
+                    coefficients[name] = coefficients.get(name, 0) + sign
+            expanded[total] = coefficients
+
+        self.matrix = np.zeros((len(self.total_names), len(self.item_names)))
+        for row, total in enumerate(self.total_names):
+            for name, weight in expanded[total].items():
+                self.matrix[row, self.positions[name]] = weight
+
+    def _topological_order(self):
+        """按依赖关系排列合计项，被引用的合计项排在前面"""
+        order = []
+        state = {}
+
+        def visit(total):
+            if state.get(total) == 'done':
+                return
+            if state.get(total) == 'visiting':
+                raise ValueError(f"合计规则存在循环引用：{total.strip()}")
+            state[total] = 'visiting'
+            for name, _ in self.rules[total]:
+                if name in self.rules:
+                    visit(name)
+            state[total] = 'done'
+            order.append(total)
+
+        for total in self.rules:
+            visit(total)
+        return tuple(order)
+
+    def dependents(self, name, recursive=True):
+        """返回引用了指定项目的合计项（按计算顺序）
+
+        recursive 为 False 时只返回直接引用它的合计项。
+        """
+        if not recursive:
+            return tuple(self._dependents.get(name, ()))
+        found = set()
+        pending = [name]
+        while pending:
+            for total in self._dependents.get(pending.pop(), ()):
+                if total not in found:
+                    found.add(total)
+                    pending.append(total)
+        return tuple(sorted(found, key=self._order.__getitem__))
+
+    def precedents(self, total):
+        """返回合计项的直接组成项目 [(项目, 符号)]"""
+        return list(self.rules.get(total, ()))
+
+    def compute(self, values):
+        """计算所有合计项
+
+        values 为 项目 × 期间 的数组，也可以是 公司 × 项目 × 期间 的叠加数组，
+        返回只包含合计项的数组（合计项 × 期间，或 公司 × 合计项 × 期间）。
+        """
+        return self.matrix @ values
+
+    def apply(self, values, period=None):
+        """就地用计算结果覆盖数组中的合计项
+
+        period 不为 None 时只重算该期间所在的列。
+        """
+        if period is None:
+            values[..., self.total_positions, :] = self.compute(values)
+        else:
+            column = PERIODS.index(period)
+            values[..., self.total_positions, column] = self.compute(values[..., column:column + 1])[..., 0]
+        return values
+
+    def derive(self, values, present=()):
+        """按依赖顺序计算派生项目，values 为 项目 × 期间 的数组（合计项已计算）
+
+        present 中的派生项目（原表中有对应的行）保留原值，其余的按组成项目计算填入。
+        返回原值与计算值不一致的 [(派生项目, 期间, 原值, 计算值)]。
+        """
+        mismatches = []
+        for total in self.derived_names:
+            positions, signs = self._rule_arrays[total]
+            computed = signs @ values[positions, :]
+            position = self.positions[total]
+            if total not in present:
+                values[position, :] = computed
+                continue
+            for period, source, value in zip(PERIODS, values[position, :].tolist(), computed.tolist()):
+                if abs(source - value) > MISMATCH_TOLERANCE:
+                    mismatches.append((total, period, source, value))
+        return mismatches
+
+    def update(self, values, name, value, period=None):
+        """修改数组中一个项目的值，并只重算受影响的合计项和派生项目
+
+        value 为该项目各期间的值，period 不为 None 时为该期间的单个值。
+        修改是人工确认的，因此引用它的派生项目即使来自原表也会重算。
+        返回被重算的合计项和派生项目名称。
+        """
+        columns = slice(None) if period is None else PERIODS.index(period)
+        values[..., self.positions[name], columns] = value
+        affected = self.dependents(name)
+        for total in affected:
+            positions, signs = self._rule_arrays[total]
+            # (..., 组成项目, 期间) → (..., 期间)
+            result = np.moveaxis(values[..., positions, :], -2, -1) @ signs
+            values[..., self.positions[total], columns] = result[..., columns]
+        return affected
+
+
+@lru_cache(maxsize=None)
+def compile_totals(sheet_type, item_names):
+    """为一张报表的模板编译合计项计算器（相同的模板只编译一次）"""
+    return TotalsEngine(item_names, TOTAL_RULES[sheet_type], DERIVED_RULES[sheet_type])
@@ -0,0 +1,89 @@
+"""后台任务
+
+耗时的分析、处理和导出在后台线程中执行，进度、步骤说明和结果通过线程安全的队列发回，
+由界面线程定时取出处理，因此界面在整个处理过程中都能响应操作。
+日志不经过这里，而是写入线程安全的 Rlogging.LogSink，由日志区域定时批量显示。
+"""
+import queue
+import threading
+
+
+class TaskCancelled(Exception):
+    """任务被用户取消"""
+
+
+class BackgroundWorker:
+    """在后台线程中一次执行一个任务
+
+    任务函数在后台线程中运行，不能直接操作界面；progress 可以作为流水线的进度回调，
+    它和 status 只把事件放入队列。界面线程定时调用 poll 取出事件并分发。
+    取消通过标志位实现，任务在下一次报告进度或调用 check_cancelled 时抛出 TaskCancelled。
+    """
+
+    def __init__(self):
+        self.events = queue.Queue()
+        self._cancel = threading.Event()
+        self._thread = None
+
+    @property
+    def busy(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def submit(self, func, on_done=None, on_error=None, on_cancel=None):
+        """在后台线程中执行 func()，完成后在界面线程中调用对应的回调"""
+        if self.busy:
+            raise RuntimeError("已有任务正在执行")
+        self._cancel.clear()
+
+        def target():
+            try:
+                result = func()
+            except TaskCancelled:
+                self.events.put(('cancelled', on_cancel, None))
+            except Exception as e:
+                self.events.put(('error', on_error, e))
+            else:
+                self.events.put(('done', on_done, result))
+
+        self._thread = threading.Thread(target=target, daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        """请求取消当前任务"""
+        if self.busy:
+            self._cancel.set()
+
+    def check_cancelled(self):
+        """任务中的检查点，已请求取消时抛出 TaskCancelled"""
+        if self._cancel.is_set():
+            raise TaskCancelled()
+
+    def status(self, text):
+        """当前步骤说明（可在任意线程中调用）"""
+        self.events.put(('status', text, None))
+
+    def progress(self, percent, eta=None):
+        """进度回调（可在任意线程中调用），同时作为取消检查点"""
+        self.events.put(('progress', percent, eta))
+        if threading.current_thread() is self._thread:
+            self.check_cancelled()
+
+    def poll(self, handlers):
+        """取出队列中的所有事件并分发
+
+        handlers 为 {'progress': func(percent, eta), 'status': func(text, None)}，
+        任务结束事件调用提交任务时给出的回调。
+        """
+        while True:
+            try:
+                kind, first, second = self.events.get_nowait()
+            except queue.Empty:
+                return
+            if kind in ('done', 'error', 'cancelled'):
+                if first:
+                    if kind == 'cancelled':
+                        first()
+                    else:
+                        first(second)
+            elif kind in handlers:
+                handlers[kind](first, second)
@@ -0,0 +1,5 @@
+"""测试配置：模块都在仓库根目录下，测试时从根目录导入"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
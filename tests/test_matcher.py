@@ -0,0 +1,93 @@
+"""项目名称匹配的测试"""
+import pytest
+
+from Rmatcher import MATCH_SYNONYMS, SYNONYMS, LabelMatcher, StatementMatcher, match_item_name
+from Rpipeline import get_templates
+
+
+# 原表中常见的写法变化：缩进、序号、减号前缀、冒号、括号、合计后缀、全角字符
+DECORATIONS = [
+    '{}',
+    '  {}',
+    '    {}',
+    '\u3000\u3000{}',
+    '{}：',
+    '{}:',
+    '一、{}',
+    '1.{}',
+    '（一）{}',
+    '减：{}',
+    '加：{}',
+    '{}合计',
+    '{}（注1）',
+    '{} ',
+]
+
+
+def _template_sets():
+    templates = {sheet_type: template.names for sheet_type, template in get_templates().items()}
+    # 同义词的标准名称和所有写法本身作为模板
+    names = []
+    for standard, variants in MATCH_SYNONYMS.items():
+        for name in [standard] + variants:
+            if name not in names:
+                names.append(name)
+    templates['synonyms'] = names
+    return templates
+
+
+def _source_names(template_names):
+    bases = set(template_names)
+    for synonyms in (MATCH_SYNONYMS, SYNONYMS):
+        for standard, variants in synonyms.items():
+            bases.add(standard)
+            bases.update(variants)
+    bases.update(name.strip() for name in template_names)
+    sources = {decoration.format(base) for base in bases for decoration in DECORATIONS}
+    sources.update(['', '其中：应收账款', 'ＡＢＣ', '2、存货', '..货币资金..'])
+    return sorted(sources)
+
+
+@pytest.mark.parametrize('sheet_type', sorted(_template_sets()))
+def test_label_matcher_candidates_equal_pairwise_scan(sheet_type):
+    template_names = _template_sets()[sheet_type]
+    matcher = LabelMatcher(template_names)
+    for source_name in _source_names(template_names):
+        expected = tuple(name for name in template_names if match_item_name(source_name, name))
+        assert matcher.candidates(source_name) == expected, source_name
+
+
+def _assigned(matcher, labels):
+    return {labels[assignment.label_index]: (assignment.template_name.strip(), assignment.method)
+            for assignment in matcher.assign(labels)}
+
+
+def test_detail_label_does_not_fuzzy_match_its_parent():
+    # "其中应收账款"与"应收账款"的Dice系数约为0.71，刚好超过阈值0.7
+    matcher = StatementMatcher(get_templates()['balance_sheet'].names)
+    assert _assigned(matcher, ['其中：应收账款']) == {}
+    assert _assigned(matcher, ['其中：应收账款', '应收帐款']) == {'应收帐款': ('应收账款', 'fuzzy')}
+
+
+def test_detail_label_fuzzy_matches_detail_template():
+    matcher = StatementMatcher(get_templates()['income_statement'].names)
+    assert _assigned(matcher, ['其中:对联营企业和合营企业投资收益']) == {
+        '其中:对联营企业和合营企业投资收益': ('其中：对联营企业和合营企业的投资收益', 'fuzzy')}
+
+
+def test_later_exact_match_wins_over_earlier_fuzzy_match():
+    matcher = StatementMatcher(get_templates()['balance_sheet'].names)
+    # 第一行去掉附注后与"应收账款"模糊匹配，第二行是精确匹配
+    labels = ['应收账款（附注五）', '应收账款']
+    assert _assigned(matcher, labels) == {'应收账款': ('应收账款', 'exact')}
+    assert _assigned(matcher, labels[::-1]) == {'应收账款': ('应收账款', 'exact')}
+
+
+def test_equal_scores_go_to_the_earlier_label():
+    matcher = StatementMatcher(get_templates()['balance_sheet'].names)
+    labels = ['应收帐款', '应收帐款（注）']
+    for _ in range(3):
+        assignments = matcher.assign(labels)
+        assert [(assignment.label_index, assignment.template_name.strip(), assignment.method)
+                for assignment in assignments] == [(0, '应收账款', 'fuzzy')]
+    assert [assignment.label_index for assignment in matcher.assign(labels[::-1])] == [0]